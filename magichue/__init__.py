@@ -1,8 +1,14 @@
 from .magichue import Light
 from .modes import *
-from .discover import discover_bulbs
-from .light import RemoteLight, LocalLight
+from .discover import discover_bulbs, iter_bulbs, aiter_bulbs, DiscoveredBulb
+from .light import AbstractLight, RemoteLight, LocalLight
+from .async_light import AsyncLocalLight
 from .http_api import RemoteAPI
+from .group import LightGroup, GroupResult, RemoteLightGroup
+from .connection import ConnectionPool
+from .registry import BulbRegistry
+from .instrument import Instrument, MetricsCollector
+from .poller import StatusPoller, StatusChange
 
 
 __author__ = "namacha"
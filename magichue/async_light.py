@@ -0,0 +1,224 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from .commands import (
+    Command,
+    CommandFrame,
+    TurnON,
+    TurnOFF,
+    QueryStatus,
+    QueryCurrentTime,
+)
+from .exceptions import InvalidData, DeviceDisconnected
+from .framing import FrameDecoder
+from .magichue import Status
+from . import modes
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _BulbProtocol(asyncio.Protocol):
+    """Buffers everything a bulb sends until somebody asks for it."""
+
+    def __init__(self):
+        self.transport = None
+        self._decoder = FrameDecoder()
+        self._waiter = None
+        self._expected = ()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        try:
+            self._decoder.feed(data)
+        except InvalidData as e:
+            if self._waiter is not None and not self._waiter.done():
+                self._waiter.set_exception(e)
+            return
+        self._wakeup()
+
+    def connection_lost(self, exc):
+        self.transport = None
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(DeviceDisconnected())
+
+    def _wakeup(self):
+        if self._waiter is None or self._waiter.done():
+            return
+        found = self._decoder.decode(self._expected)
+        if found is not None:
+            self._waiter.set_result(bytes(found[1]))
+
+    def discard_buffer(self):
+        if len(self._decoder):
+            _LOGGER.debug("Discarding %d stale bytes", len(self._decoder))
+        self._decoder.clear()
+
+    def write(self, data: bytes):
+        if self.transport is None or self.transport.is_closing():
+            raise DeviceDisconnected
+        self.transport.write(data)
+
+    async def read(self, cmd: Command) -> bytes:
+        """Wait for a complete, valid response to `cmd`."""
+        if self.transport is None:
+            raise DeviceDisconnected
+        self._expected = (cmd,)
+        self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            self._wakeup()
+            return await self._waiter
+        finally:
+            self._waiter = None
+
+
+class AsyncLocalLight:
+    """A local bulb driven by asyncio.
+
+    Every method that talks to the bulb is a coroutine, so a single event loop
+    can drive many bulbs at once.
+
+    >>> light = await AsyncLocalLight.connect("192.168.0.10")
+    >>> await light.set_rgb((255, 0, 0))
+    """
+
+    _LOGGER = logging.getLogger(__name__ + ".AsyncLocalLight")
+
+    port = 5577
+    timeout = 1
+
+    def __init__(self, ipaddr: str, allow_fading: bool = True):
+        self.ipaddr = ipaddr
+        self.allow_fading = allow_fading
+        self.status = Status()
+        self._protocol = None
+        self._lock = None
+
+    def __repr__(self):
+        on = "on" if self.status.on else "off"
+        return "<%s: %s %s>" % (self.__class__.__name__, self.ipaddr, on)
+
+    @classmethod
+    async def connect(cls, ipaddr: str, allow_fading: bool = True):
+        """Open a connection to the bulb and fetch its status."""
+        light = cls(ipaddr, allow_fading=allow_fading)
+        await light._connect()
+        await light.update_status()
+        return light
+
+    async def _connect(self):
+        self._LOGGER.debug("Trying to make a connection with bulb(%s)", self.ipaddr)
+        loop = asyncio.get_running_loop()
+        _, self._protocol = await asyncio.wait_for(
+            loop.create_connection(_BulbProtocol, self.ipaddr, self.port),
+            self.timeout,
+        )
+        self._lock = asyncio.Lock()
+        self._LOGGER.debug("Connection has been established with %s", self.ipaddr)
+
+    async def close(self):
+        if self._protocol is not None and self._protocol.transport is not None:
+            self._protocol.transport.close()
+        self._protocol = None
+
+    async def __aenter__(self):
+        if self._protocol is None:
+            await self._connect()
+            await self.update_status()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _send_command(self, cmd: Command, send_only: bool = True):
+        if self._protocol is None:
+            raise DeviceDisconnected
+        data = cmd.byte_string()
+        self._LOGGER.debug(
+            "Sending command(%s) to %s: %s", cmd.__name__, self.ipaddr, data
+        )
+        async with self._lock:
+            if send_only:
+                self._protocol.write(data)
+                return None
+            self._protocol.discard_buffer()
+            self._protocol.write(data)
+            try:
+                received = await asyncio.wait_for(
+                    self._protocol.read(cmd), self.timeout
+                )
+            except asyncio.TimeoutError:
+                raise InvalidData(
+                    "Expect length: %d, timed out waiting for %s"
+                    % (cmd.response_len, self.ipaddr)
+                )
+        return tuple(received)
+
+    async def _send_commands(self, cmds):
+        """Send several write-only commands in one write."""
+        if self._protocol is None:
+            raise DeviceDisconnected
+        data = b"".join(cmd.byte_string() for cmd in cmds)
+        self._LOGGER.debug(
+            "Sending %d commands to %s: %s", len(cmds), self.ipaddr, data
+        )
+        async with self._lock:
+            self._protocol.write(data)
+
+    async def _set_mode(self, _mode):
+        cmd = _mode.frame()
+        await self._send_command(cmd)
+
+    async def _apply_status(self):
+        frames = []
+        if not self.allow_fading:
+            frames.append(modes.jump_frame(self.rgb))
+        frames.append(CommandFrame(self.status.make_data(), name="SetColor"))
+        await self._send_commands(frames)
+
+    @property
+    def on(self):
+        return self.status.on
+
+    @property
+    def rgb(self):
+        return self.status.rgb()
+
+    @property
+    def mode(self):
+        return self.status.mode
+
+    async def turn_on(self):
+        """Turn bulb power on"""
+        await self._send_command(TurnON)
+        self.status.on = True
+
+    async def turn_off(self):
+        """Turn bulb power off"""
+        await self._send_command(TurnOFF)
+        self.status.on = False
+
+    async def update_status(self):
+        """Sync local status with bulb"""
+        data = await self._send_command(QueryStatus, send_only=False)
+        self.status.parse(data)
+
+    async def set_rgb(self, rgb):
+        self.status.update_rgb(rgb)
+        await self._apply_status()
+
+    async def set_mode(self, v):
+        if not isinstance(v, modes.Mode):
+            raise ValueError("Invalid value: value must be a instance of Mode")
+        if isinstance(v, modes.CustomMode):
+            self.status.speed = v.speed
+        self.status.mode = v
+        await self._set_mode(v)
+
+    async def get_current_time(self) -> datetime:
+        """Get bulb clock time."""
+        data = await self._send_command(QueryCurrentTime, send_only=False)
+        return datetime(data[3] + 2000, data[4], data[5], data[6], data[7], data[8])
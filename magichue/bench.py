@@ -0,0 +1,304 @@
+"""End-to-end benchmark of LocalLight, RemoteLight and the legacy Light.
+
+Runs every operation against simulated bulbs (see magichue.simulator) and a
+local stand-in for the cloud API, at several fleet sizes, and prints the
+latency percentiles and throughput of each as JSON:
+
+    $ python -m magichue.bench --sizes 1 10 100 1000 --output bench.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence
+
+from . import __version__
+from . import modes
+from .discover import iter_bulbs
+from .http_api import RemoteAPI
+from .light import LocalLight, RemoteLight
+from .magichue import Light
+from .simulator import SimulatedBulb, Simulator
+
+
+CLIENTS = ("local", "remote", "legacy")
+OPS = ("turn_on", "rgb", "update_status", "mode", "discovery")
+SIZES = (1, 10, 100, 1000)
+
+_MODES = (modes.RAINBOW_CROSSFADE, modes.RED_GRADUALLY)
+
+
+def _turn_on(light, i):
+    light.on = True
+
+
+def _rgb(light, i):
+    light.rgb = (i % 256, 255 - i % 256, 128)
+
+
+def _update_status(light, i):
+    light.update_status()
+
+
+def _mode(light, i):
+    light.mode = _MODES[i % len(_MODES)]
+
+
+_OPS = {
+    "turn_on": _turn_on,
+    "rgb": _rgb,
+    "update_status": _update_status,
+    "mode": _mode,
+}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """The `q`-th percentile (0-100) of sorted `values`, by nearest rank."""
+    if not values:
+        return float("nan")
+    rank = max(1, -(-len(values) * q // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(client, op, fleet, latencies, seconds) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "client": client,
+        "op": op,
+        "fleet": fleet,
+        "commands": len(latencies),
+        "seconds": round(seconds, 6),
+        "commands_per_s": round(len(latencies) / seconds, 1) if seconds else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+class _CloudHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        bulbs = self.server.bulbs
+        if self.path.endswith("/sendRequestCommand/MagicHue"):
+            bulb = bulbs[payload["macAddress"]]
+            with self.server.lock:
+                response = bulb.handle(bytes.fromhex(payload["hexData"]))
+            return self._reply({"code": 0, "data": (response or b"").hex()})
+        if self.path.endswith("/sendCommandBatch/MagicHue"):
+            with self.server.lock:
+                for item in payload["dataCommandItems"]:
+                    bulbs[item["macAddress"]].handle(bytes.fromhex(item["hexData"]))
+            return self._reply({"code": 0})
+        return self._reply({"code": 0, "token": "TOKEN"})
+
+    def do_GET(self):
+        devices = [
+            {
+                "deviceType": bulb.status.bulb_type,
+                "macAddress": mac,
+                "state": bulb.status.dump().hex(),
+                "isOnline": True,
+            }
+            for mac, bulb in self.server.bulbs.items()
+        ]
+        return self._reply({"code": 0, "data": devices})
+
+
+class _FakeCloud:
+    """The cloud API, relaying commands to simulated bulbs."""
+
+    def __init__(self, bulbs: Sequence[SimulatedBulb]):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _CloudHandler)
+        self._server.daemon_threads = True
+        self._server.bulbs = {bulb.macaddr: bulb for bulb in bulbs}
+        self._server.lock = threading.Lock()
+        host, port = self._server.server_address
+        self.base = "http://%s:%d/app" % (host, port)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class Bench:
+    """Simulated fleet of `fleet` bulbs, and the clients to drive it."""
+
+    def __init__(self, fleet: int, rounds: int = 5, workers: int = 64):
+        self.fleet = fleet
+        self.rounds = rounds
+        self.workers = min(workers, fleet)
+        self.bulbs = [SimulatedBulb(seed=i) for i in range(fleet)]
+        self.simulator = Simulator(
+            self.bulbs, port=0, discovery_host="127.0.0.1", discovery_port=0
+        )
+        self.cloud = _FakeCloud(self.bulbs)
+        self._running = None
+
+    def __enter__(self):
+        self._running = self.simulator.running()
+        self._running.__enter__()
+        self.cloud.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.cloud.__exit__(*exc)
+        self._running.__exit__(*exc)
+
+    def _map(self, func, items) -> list:
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(func, items))
+
+    def lights(self, client: str) -> list:
+        if client == "local":
+
+            def make(address):
+                cls = type("LocalLight", (LocalLight,), {"port": address[1]})
+                return cls(address[0])
+
+            return self._map(make, self.simulator.addresses)
+        if client == "remote":
+            api = RemoteAPI("TOKEN", api_base=self.cloud.base, pool_size=self.workers)
+            return self._map(
+                lambda bulb: RemoteLight(api, bulb.macaddr), self.bulbs
+            )
+        if client == "legacy":
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                return self._map(
+                    lambda address: Light(address[0], port=address[1]),
+                    self.simulator.addresses,
+                )
+        raise ValueError("Unknown client: %s" % client)
+
+    def close(self, lights):
+        for light in lights:
+            close = getattr(light, "close", None)
+            if close is not None:
+                close()
+            elif getattr(light, "_sock", None) is not None:
+                light._sock.close()
+
+    def run_op(self, client: str, op: str, lights: list) -> dict:
+        func = _OPS[op]
+
+        def drive(light):
+            latencies = []
+            for i in range(self.rounds):
+                start = time.perf_counter()
+                func(light, i)
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        start = time.perf_counter()
+        results = self._map(drive, lights)
+        seconds = time.perf_counter() - start
+        latencies = [latency for result in results for latency in result]
+        return summarize(client, op, self.fleet, latencies, seconds)
+
+    def run_discovery(self, timeout: float = 5.0) -> dict:
+        arrivals = []
+        start = time.perf_counter()
+        for _ in iter_bulbs(
+            timeout=timeout,
+            broadcast_ip="127.0.0.1",
+            interval=0.2,
+            port=self.simulator.discovery_port,
+        ):
+            arrivals.append(time.perf_counter() - start)
+            if len(arrivals) == self.fleet:
+                break
+        seconds = time.perf_counter() - start
+        return summarize("local", "discovery", self.fleet, arrivals, seconds)
+
+
+def run(
+    clients: Sequence[str] = CLIENTS,
+    ops: Sequence[str] = OPS,
+    sizes: Sequence[int] = SIZES,
+    rounds: int = 5,
+    workers: int = 64,
+) -> Dict[str, object]:
+    results: List[dict] = []
+    for fleet in sizes:
+        with Bench(fleet, rounds=rounds, workers=workers) as bench:
+            if "discovery" in ops:
+                results.append(bench.run_discovery())
+            for client in clients:
+                lights = bench.lights(client)
+                try:
+                    for op in ops:
+                        if op != "discovery":
+                            results.append(bench.run_op(client, op, lights))
+                finally:
+                    bench.close(lights)
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rounds": rounds,
+        "results": results,
+    }
+
+
+def _raise_file_limit():
+    # Each simulated bulb needs a socket on both ends.
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m magichue.bench",
+        description="Benchmark commands against simulated bulbs.",
+    )
+    parser.add_argument("--clients", nargs="+", choices=CLIENTS, default=CLIENTS)
+    parser.add_argument("--ops", nargs="+", choices=OPS, default=OPS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    _raise_file_limit()
+    report = run(args.clients, args.ops, args.sizes, args.rounds, args.workers)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
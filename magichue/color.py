@@ -0,0 +1,245 @@
+"""Batched color conversions and scene generators.
+
+RGB values are integers from 0 to 255. Hue, saturation, value and
+lightness are floats from 0 to 1. Every conversion takes a sequence of
+colors; when NumPy is installed and a NumPy array is passed in, the
+conversion is vectorized and an array is returned.
+"""
+
+import colorsys
+import math
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+__all__ = [
+    "HAS_NUMPY",
+    "rgb_to_hsv",
+    "hsv_to_rgb",
+    "rgb_to_hsl",
+    "hsl_to_rgb",
+    "kelvin_to_rgb",
+    "gradient",
+    "rainbow",
+    "palette",
+]
+
+
+HAS_NUMPY = np is not None
+
+RGB = Tuple[int, int, int]
+
+
+def _is_array(colors) -> bool:
+    return HAS_NUMPY and isinstance(colors, np.ndarray)
+
+
+def _to_byte(v: float) -> int:
+    return min(255, max(0, int(round(v * 255))))
+
+
+def _np_to_bytes(arr):
+    return np.clip(np.rint(arr * 255), 0, 255).astype(np.uint8)
+
+
+def _np_hue(r, g, b, maxc, delta):
+    safe = np.where(delta > 0, delta, 1)
+    rc = (maxc - r) / safe
+    gc = (maxc - g) / safe
+    bc = (maxc - b) / safe
+    h = np.where(
+        r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc)
+    )
+    return np.where(delta > 0, (h / 6.0) % 1.0, 0.0)
+
+
+def _np_rgb_to_hsv(rgb):
+    rgb = np.asarray(rgb, dtype=float) / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    delta = maxc - rgb.min(axis=-1)
+    s = np.where(maxc > 0, delta / np.where(maxc > 0, maxc, 1), 0.0)
+    return np.stack([_np_hue(r, g, b, maxc, delta), s, maxc], axis=-1)
+
+
+def _np_hsv_to_rgb(hsv):
+    hsv = np.asarray(hsv, dtype=float)
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(int) % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return _np_to_bytes(np.stack([r, g, b], axis=-1))
+
+
+def _np_rgb_to_hsl(rgb):
+    rgb = np.asarray(rgb, dtype=float) / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    delta = maxc - minc
+    lightness = (maxc + minc) / 2.0
+    denom = 1.0 - np.abs(2.0 * lightness - 1.0)
+    s = np.where(delta > 0, delta / np.where(denom > 0, denom, 1), 0.0)
+    return np.stack([_np_hue(r, g, b, maxc, delta), s, lightness], axis=-1)
+
+
+def _np_hsl_to_rgb(hsl):
+    hsl = np.asarray(hsl, dtype=float)
+    h, s, lightness = hsl[..., 0], hsl[..., 1], hsl[..., 2]
+    v = lightness + s * np.minimum(lightness, 1.0 - lightness)
+    sv = np.where(v > 0, 2.0 * (1.0 - lightness / np.where(v > 0, v, 1)), 0.0)
+    return _np_hsv_to_rgb(np.stack([h, sv, v], axis=-1))
+
+
+def rgb_to_hsv(colors):
+    """Convert (r, g, b) colors to (h, s, v)."""
+    if _is_array(colors):
+        return _np_rgb_to_hsv(colors)
+    return [
+        colorsys.rgb_to_hsv(r / 255.0, g / 255.0, b / 255.0) for r, g, b in colors
+    ]
+
+
+def hsv_to_rgb(colors):
+    """Convert (h, s, v) colors to (r, g, b)."""
+    if _is_array(colors):
+        return _np_hsv_to_rgb(colors)
+    return [
+        tuple(_to_byte(c) for c in colorsys.hsv_to_rgb(h, s, v))
+        for h, s, v in colors
+    ]
+
+
+def rgb_to_hsl(colors):
+    """Convert (r, g, b) colors to (h, s, l)."""
+    if _is_array(colors):
+        return _np_rgb_to_hsl(colors)
+    result = []
+    for r, g, b in colors:
+        h, lightness, s = colorsys.rgb_to_hls(r / 255.0, g / 255.0, b / 255.0)
+        result.append((h, s, lightness))
+    return result
+
+
+def hsl_to_rgb(colors):
+    """Convert (h, s, l) colors to (r, g, b)."""
+    if _is_array(colors):
+        return _np_hsl_to_rgb(colors)
+    return [
+        tuple(_to_byte(c) for c in colorsys.hls_to_rgb(h, lightness, s))
+        for h, s, lightness in colors
+    ]
+
+
+def _kelvin_to_rgb(kelvin: float) -> RGB:
+    # Tanner Helland's approximation of the black-body color, 1000K-40000K.
+    t = min(max(kelvin, 1000), 40000) / 100.0
+    if t <= 66:
+        r = 255.0
+        g = 99.4708025861 * math.log(t) - 161.1195681661
+    else:
+        r = 329.698727446 * (t - 60) ** -0.1332047592
+        g = 288.1221695283 * (t - 60) ** -0.0755148492
+    if t >= 66:
+        b = 255.0
+    elif t <= 19:
+        b = 0.0
+    else:
+        b = 138.5177312231 * math.log(t - 10) - 305.0447927307
+    return tuple(min(255, max(0, int(round(c)))) for c in (r, g, b))
+
+
+def kelvin_to_rgb(kelvins):
+    """Approximate (r, g, b) colors of the given color temperatures."""
+    if _is_array(kelvins):
+        rgb = [_kelvin_to_rgb(k) for k in kelvins.ravel()]
+        return np.array(rgb, dtype=np.uint8)
+    return [_kelvin_to_rgb(k) for k in kelvins]
+
+
+def _positions(n: int) -> List[float]:
+    if n < 1:
+        raise ValueError("n must be a positive integer")
+    if n == 1:
+        return [0.0]
+    return [i / (n - 1) for i in range(n)]
+
+
+def _unwrap_hues(hsv):
+    """Shift hues so each step takes the short way around the wheel."""
+    result = [list(hsv[0])]
+    for h, s, v in hsv[1:]:
+        prev = result[-1][0]
+        h += round(prev - h)
+        result.append([h, s, v])
+    return result
+
+
+def _interp(stops, x):
+    # Piecewise-linear value at x (0..1) through evenly spaced stops.
+    pos = x * (len(stops) - 1)
+    i = min(int(pos), len(stops) - 2)
+    t = pos - i
+    return [a + (b - a) * t for a, b in zip(stops[i], stops[i + 1])]
+
+
+def palette(colors: Sequence[RGB], n: int, space: str = "rgb") -> List[RGB]:
+    """`n` colors blended evenly through the palette `colors`, in order.
+
+    Colors are interpolated in "rgb" or "hsv" space; in "hsv" space the hue
+    takes the short way around the color wheel.
+    """
+    if space not in ("rgb", "hsv"):
+        raise ValueError("space must be 'rgb' or 'hsv'")
+    if not colors:
+        raise ValueError("palette needs at least one color")
+    positions = _positions(n)
+    if len(colors) == 1:
+        return [tuple(colors[0])] * n
+    if space == "rgb":
+        stops = [[float(c) for c in color] for color in colors]
+    else:
+        stops = _unwrap_hues(rgb_to_hsv(colors))
+    if HAS_NUMPY:
+        xp = np.linspace(0.0, 1.0, len(stops))
+        arr = np.array(stops)
+        values = np.stack(
+            [np.interp(positions, xp, arr[:, c]) for c in range(3)], axis=-1
+        )
+        if space == "rgb":
+            rgb = np.clip(np.rint(values), 0, 255).astype(np.uint8)
+        else:
+            values[:, 0] %= 1.0
+            rgb = _np_hsv_to_rgb(values)
+        return [tuple(int(c) for c in color) for color in rgb]
+    values = [_interp(stops, x) for x in positions]
+    if space == "rgb":
+        return [tuple(min(255, max(0, int(round(c)))) for c in v) for v in values]
+    return hsv_to_rgb([(h % 1.0, s, v) for h, s, v in values])
+
+
+def gradient(start: RGB, end: RGB, n: int, space: str = "rgb") -> List[RGB]:
+    """`n` colors from `start` to `end`, interpolated in "rgb" or "hsv" space."""
+    return palette([start, end], n, space=space)
+
+
+def rainbow(
+    n: int, saturation: float = 1.0, value: float = 1.0, offset: float = 0.0
+) -> List[RGB]:
+    """`n` colors evenly spread around the hue wheel, starting at `offset`."""
+    if n < 1:
+        raise ValueError("n must be a positive integer")
+    hsv = [((offset + i / n) % 1.0, saturation, value) for i in range(n)]
+    if HAS_NUMPY:
+        return [tuple(int(c) for c in rgb) for rgb in _np_hsv_to_rgb(hsv)]
+    return hsv_to_rgb(hsv)
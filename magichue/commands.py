@@ -1,4 +1,3 @@
-import struct
 from typing import List
 
 
@@ -16,6 +15,10 @@ class _Meta(type):
 class Command:
 
     needs_terminator = True
+    # Safe to send again after a failure, when the first attempt may already
+    # have reached the bulb: the command reads a state or sets an absolute
+    # one. Off by default; a repeated mode frame restarts the effect.
+    idempotent = False
     array: List[int]
     response_len: int
 
@@ -28,34 +31,128 @@ class Command:
 
     @staticmethod
     def calc_checksum(arr):
-        hex_checksum = hex(sum(arr))[-2:]
-        checksum = int(hex_checksum, 16)
-        return checksum
+        return sum(arr) & 0xFF
 
     @classmethod
-    def from_array(cls, arr, response_len: int = 0):
-        cmd = Command
-        cmd.array = arr
-        cmd.response_len = response_len
-        return cmd
+    def from_array(cls, arr, response_len: int = 0) -> "CommandFrame":
+        return CommandFrame(arr, response_len)
+
+    @classmethod
+    def response_prefix(cls, is_remote: bool = False) -> bytes:
+        """Leading bytes of the bulb's response to this command."""
+        return bytes([0xF0 if is_remote else 0x0F, cls.array[0]])
 
     @classmethod
     def attach_checksum(cls, arr):
         return arr + [cls.calc_checksum(arr)]
 
+    @classmethod
+    def frame(cls) -> "CommandFrame":
+        """Prebuilt frame of this command, shared by every sender."""
+        return cached_frame(
+            cls,
+            cls.array,
+            getattr(cls, "response_len", 0),
+            cls.needs_terminator,
+            cls.__name__,
+            cls.idempotent,
+        )
+
     @classmethod
     def hex_array(cls, is_remote: bool = False) -> list:
-        return cls.attach_checksum(cls.append_terminator(cls.array, is_remote))
+        return cls.frame().hex_array(is_remote)
 
     @classmethod
     def byte_string(cls, is_remote: bool = False) -> bytes:
-        _arr = cls.attach_checksum(cls.append_terminator(cls.array, is_remote))
-        return struct.pack("!%dB" % len(_arr), *_arr)
+        return cls.frame().byte_string(is_remote)
 
     @classmethod
     def hex_string(cls, is_remote: bool = False) -> str:
-        _arr = cls.attach_checksum(cls.append_terminator(cls.array, is_remote))
-        return "".join([hex(v)[2:].zfill(2) for v in _arr])
+        return cls.frame().hex_string(is_remote)
+
+
+def _build_frame(arr, terminator) -> bytes:
+    buf = bytearray(arr)
+    if terminator is not None:
+        buf.append(terminator)
+    buf.append(sum(buf) & 0xFF)
+    return bytes(buf)
+
+
+class CommandFrame:
+    """An immutable command with its frames already built.
+
+    Both the local and the remote frame (terminator and checksum attached)
+    are made once at construction, so an instance can be prepared ahead of
+    time and shared between threads.
+    """
+
+    __slots__ = ("array", "response_len", "name", "idempotent", "_local", "_remote")
+
+    def __init__(
+        self,
+        arr,
+        response_len: int = 0,
+        needs_terminator: bool = True,
+        name: str = "Command",
+        idempotent: bool = False,
+    ):
+        setattr_ = object.__setattr__
+        setattr_(self, "array", tuple(arr))
+        setattr_(self, "response_len", response_len)
+        setattr_(self, "name", name)
+        setattr_(self, "idempotent", idempotent)
+        local_term, remote_term = (0x0F, 0xF0) if needs_terminator else (None, None)
+        setattr_(self, "_local", _build_frame(arr, local_term))
+        setattr_(self, "_remote", _build_frame(arr, remote_term))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    def __repr__(self):
+        return "<CommandFrame: %s %s>" % (self.name, self._local.hex())
+
+    def __eq__(self, other):
+        if not isinstance(other, CommandFrame):
+            return NotImplemented
+        return self._local == other._local and self.response_len == other.response_len
+
+    def __hash__(self):
+        return hash((self._local, self.response_len))
+
+    @property
+    def __name__(self):
+        return self.name
+
+    def response_prefix(self, is_remote: bool = False) -> bytes:
+        return bytes([0xF0 if is_remote else 0x0F, self.array[0]])
+
+    def hex_array(self, is_remote: bool = False) -> list:
+        return list(self._remote if is_remote else self._local)
+
+    def byte_string(self, is_remote: bool = False) -> bytes:
+        return self._remote if is_remote else self._local
+
+    def hex_string(self, is_remote: bool = False) -> str:
+        return (self._remote if is_remote else self._local).hex()
+
+
+_FRAME_CACHE = {}
+
+
+def cached_frame(
+    key, arr, response_len=0, needs_terminator=True, name="Command", idempotent=False
+):
+    """Return the CommandFrame stored under `key`, building it on first use.
+
+    Only use this for frames drawn from a small, fixed set (static commands,
+    built-in modes); the cache is never evicted.
+    """
+    frame = _FRAME_CACHE.get(key)
+    if frame is None:
+        frame = CommandFrame(arr, response_len, needs_terminator, name, idempotent)
+        _FRAME_CACHE[key] = frame
+    return frame
 
 
 class TurnON(Command, metaclass=_Meta):
@@ -71,6 +168,7 @@ class TurnON(Command, metaclass=_Meta):
 
     array = [0x71, 0x23]
     response_len = 4
+    idempotent = True
 
 
 class TurnOFF(Command, metaclass=_Meta):
@@ -86,6 +184,7 @@ class TurnOFF(Command, metaclass=_Meta):
 
     array = [0x71, 0x24]
     response_len = 4
+    idempotent = True
 
 
 class QueryStatus(Command, metaclass=_Meta):
@@ -112,6 +211,11 @@ class QueryStatus(Command, metaclass=_Meta):
     array = [0x81, 0x8A, 0x8B]
     response_len = 14
     needs_terminator = False
+    idempotent = True
+
+    @classmethod
+    def response_prefix(cls, is_remote: bool = False) -> bytes:
+        return bytes([cls.array[0]])
 
 
 class QueryCurrentTime(Command, metaclass=_Meta):
@@ -135,6 +239,7 @@ class QueryCurrentTime(Command, metaclass=_Meta):
 
     array = [0x11, 0x1A, 0x1B]
     response_len = 12
+    idempotent = True
 
 
 class QueryTimers(Command, metaclass=_Meta):
@@ -142,6 +247,7 @@ class QueryTimers(Command, metaclass=_Meta):
 
     array = [0x22, 0x2A, 0x2B]
     response_len = 94
+    idempotent = True
 
 
 class QueryCustomMode(Command, metaclass=_Meta):
@@ -149,6 +255,7 @@ class QueryCustomMode(Command, metaclass=_Meta):
 
     array = [0x52, 0x5A, 0x5B]
     response_len = 70
+    idempotent = True
 
 
 QUERY_STATUS_1 = 0x81
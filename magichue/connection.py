@@ -0,0 +1,71 @@
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Caps the number of sockets open across many LocalLights.
+
+    Lights sharing a pool register their socket when it is opened. Once more
+    than `max_connections` are open, the least recently used idle lights are
+    disconnected; they reconnect transparently the next time they are used.
+
+    >>> pool = ConnectionPool(max_connections=50)
+    >>> lights = [LocalLight(addr, pool=pool, lazy=True) for addr in addrs]
+    """
+
+    def __init__(self, max_connections: int = 64):
+        if max_connections < 1:
+            raise ValueError("max_connections must be a positive integer")
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._open = OrderedDict()  # lights with an open socket, LRU first
+        self._busy = {}  # light -> number of commands in flight
+
+    def __repr__(self):
+        return "<ConnectionPool: %d/%d open>" % (len(self._open), self.max_connections)
+
+    def __len__(self):
+        return len(self._open)
+
+    def __contains__(self, light):
+        return light in self._open
+
+    @contextmanager
+    def checkout(self, light):
+        """Keep `light` from being evicted while inside the block."""
+        with self._lock:
+            self._busy[light] = self._busy.get(light, 0) + 1
+            if light in self._open:
+                self._open.move_to_end(light)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._busy[light] -= 1
+                if not self._busy[light]:
+                    del self._busy[light]
+
+    def opened(self, light):
+        """Register a newly opened connection and evict idle ones over the cap."""
+        with self._lock:
+            self._open[light] = None
+            self._open.move_to_end(light)
+            excess = len(self._open) - self.max_connections
+            victims = [
+                other
+                for other in self._open
+                if other is not light and other not in self._busy
+            ][: max(excess, 0)]
+            for other in victims:
+                del self._open[other]
+                _LOGGER.debug("Evicting idle connection to %s", other.ipaddr)
+                other._close_socket()
+
+    def closed(self, light):
+        with self._lock:
+            self._open.pop(light, None)
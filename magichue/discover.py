@@ -1,30 +1,161 @@
+import asyncio
+import selectors
 import socket
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Union
 
 
-def make_socket(timeout):
+DISCOVERY_PORT = 48899
+DISCOVERY_MSG = b"HF-A11ASSISTHREAD"
+
+Addresses = Union[str, Iterable[str]]
+
+
+@dataclass(frozen=True)
+class DiscoveredBulb:
+
+    ipaddr: str
+    macaddr: str
+    model: str
+
+
+def make_socket(timeout, source_ip=None):
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
     sock.settimeout(timeout)
+    if source_ip is not None:
+        sock.bind((source_ip, 0))
     return sock
 
 
-def discover_bulbs(timeout=1, broadcast_ip="255.255.255.255"):
-    DISCOVERY_PORT = 48899
-    DISCOVERY_MSG = b"HF-A11ASSISTHREAD"
-    addrs = []
+def parse_response(response: bytes) -> Optional[DiscoveredBulb]:
+    """Parse a `ip,mac,model` discovery reply. Returns None for anything else."""
+    if response == DISCOVERY_MSG:
+        return None
+    try:
+        fields = response.decode().strip().split(",")
+    except UnicodeDecodeError:
+        return None
+    if len(fields) < 2 or not fields[0]:
+        return None
+    model = fields[2] if len(fields) > 2 else ""
+    return DiscoveredBulb(ipaddr=fields[0], macaddr=fields[1], model=model)
+
+
+def _as_list(addrs: Addresses) -> List[str]:
+    if isinstance(addrs, str):
+        return [addrs]
+    return list(addrs)
 
-    sock = make_socket(timeout)
-    sock.sendto(DISCOVERY_MSG, (broadcast_ip, DISCOVERY_PORT))
 
+def iter_bulbs(
+    timeout: float = 1,
+    broadcast_ip: Addresses = "255.255.255.255",
+    interval: Optional[float] = 0.3,
+    source_ip: Optional[Addresses] = None,
+    port: int = DISCOVERY_PORT,
+) -> Iterator[DiscoveredBulb]:
+    """Yield each bulb as soon as it answers, for up to `timeout` seconds.
+
+    The discovery message is sent to every address in `broadcast_ip`, and
+    sent again every `interval` seconds (or only once if None) to catch lost
+    replies. `source_ip` binds one socket per local address, to reach
+    several interfaces at once. Bulbs are reported once per MAC address.
+    """
+    sources = [None] if source_ip is None else _as_list(source_ip)
+    targets = _as_list(broadcast_ip)
+    socks = [make_socket(0, source) for source in sources]
+    # Not select(), which fails on file descriptors above 1024.
+    selector = selectors.DefaultSelector()
+    for sock in socks:
+        selector.register(sock, selectors.EVENT_READ)
+    seen = set()
+    try:
+        now = time.monotonic()
+        deadline = now + timeout
+        next_broadcast = now
+        while now < deadline:
+            if next_broadcast is not None and now >= next_broadcast:
+                for sock in socks:
+                    for target in targets:
+                        sock.sendto(DISCOVERY_MSG, (target, port))
+                next_broadcast = now + interval if interval else None
+            wake = deadline if next_broadcast is None else min(deadline, next_broadcast)
+            for key, _ in selector.select(max(0, wake - now)):
+                sock = key.fileobj
+                try:
+                    response, _ = sock.recvfrom(64)
+                except OSError:
+                    continue
+                bulb = parse_response(response)
+                if bulb is not None and bulb.macaddr not in seen:
+                    seen.add(bulb.macaddr)
+                    yield bulb
+            now = time.monotonic()
+    finally:
+        selector.close()
+        for sock in socks:
+            sock.close()
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    def datagram_received(self, data, addr):
+        bulb = parse_response(data)
+        if bulb is not None:
+            self.queue.put_nowait(bulb)
+
+
+async def aiter_bulbs(
+    timeout: float = 1,
+    broadcast_ip: Addresses = "255.255.255.255",
+    interval: Optional[float] = 0.3,
+    source_ip: Optional[Addresses] = None,
+    port: int = DISCOVERY_PORT,
+) -> AsyncIterator[DiscoveredBulb]:
+    """Async version of `iter_bulbs`."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    sources = [None] if source_ip is None else _as_list(source_ip)
+    targets = _as_list(broadcast_ip)
+    transports = []
+    seen = set()
     try:
-        while True:
-            response, addr = sock.recvfrom(64)
-            if response != DISCOVERY_MSG:
-                addr = response.decode().split(",")[0]
-                addrs.append(addr)
-    except socket.timeout:
-        pass
-
-    sock.close()
-    return addrs
+        for source in sources:
+            sock = make_socket(0, source)
+            sock.setblocking(False)
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _DiscoveryProtocol(queue), sock=sock
+            )
+            transports.append(transport)
+        deadline = loop.time() + timeout
+        next_broadcast = loop.time()
+        while loop.time() < deadline:
+            if next_broadcast is not None and loop.time() >= next_broadcast:
+                for transport in transports:
+                    for target in targets:
+                        transport.sendto(DISCOVERY_MSG, (target, port))
+                next_broadcast = loop.time() + interval if interval else None
+            wake = deadline if next_broadcast is None else min(deadline, next_broadcast)
+            try:
+                bulb = await asyncio.wait_for(
+                    queue.get(), max(0, wake - loop.time())
+                )
+            except asyncio.TimeoutError:
+                continue
+            if bulb.macaddr not in seen:
+                seen.add(bulb.macaddr)
+                yield bulb
+    finally:
+        for transport in transports:
+            transport.close()
+
+
+def discover_bulbs(timeout=1, broadcast_ip="255.255.255.255"):
+    """Return IP addresses of the bulbs that answered within `timeout`."""
+    bulbs = iter_bulbs(timeout=timeout, broadcast_ip=broadcast_ip, interval=None)
+    return [bulb.ipaddr for bulb in bulbs]
@@ -26,3 +26,9 @@ class DeviceDisconnected(Exception):
     """Local device is disconnected"""
 
     pass
+
+
+class DeviceBusy(Exception):
+    """Device is still handling an earlier call"""
+
+    pass
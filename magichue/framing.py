@@ -0,0 +1,98 @@
+import logging
+from typing import Optional, Sequence, Tuple
+
+from .commands import Command
+from .exceptions import InvalidData
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def valid_checksum(frame) -> bool:
+    return sum(frame[:-1]) & 0xFF == frame[-1]
+
+
+class FrameDecoder:
+    """Cuts checksummed responses out of a stream of bytes from a bulb.
+
+    Bytes are written straight into a preallocated buffer (`buffer()` and
+    `advance()`, for `recv_into`) or copied in with `feed()`. `decode()`
+    returns the first complete response to one of the given commands,
+    waiting for the rest of a response split over several reads, and
+    skipping garbage and frames with a bad checksum.
+
+    >>> decoder = FrameDecoder()
+    >>> decoder.advance(sock.recv_into(decoder.buffer()))
+    >>> decoder.decode([QueryStatus])
+    (<class 'QueryStatus'>, <memory at ...>)
+    """
+
+    def __init__(self, size: int = 1024):
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def _compact(self):
+        if self._start:
+            size = self._end - self._start
+            self._view[:size] = self._view[self._start : self._end]
+            self._start, self._end = 0, size
+
+    def buffer(self) -> memoryview:
+        """Free space to receive into. Frames returned so far are invalidated."""
+        self._compact()
+        if self._end == len(self._buf):
+            self.clear()
+            raise InvalidData("Frame decoder buffer overflow")
+        return self._view[self._end :]
+
+    def advance(self, n: int):
+        """Mark `n` bytes written into `buffer()` as received."""
+        self._end += n
+
+    def feed(self, data: bytes):
+        view = self.buffer()
+        if len(data) > len(view):
+            self.clear()
+            raise InvalidData("Frame decoder buffer overflow")
+        view[: len(data)] = data
+        self.advance(len(data))
+
+    def decode(
+        self, cmds: Sequence[Command]
+    ) -> Optional[Tuple[Command, memoryview]]:
+        """The earliest complete response to any of `cmds`, or None.
+
+        The frame is a view of the internal buffer and stays valid until
+        more bytes are received.
+        """
+        prefixes = [(cmd.response_prefix(), cmd) for cmd in cmds]
+        while True:
+            best = None
+            for prefix, cmd in prefixes:
+                idx = self._buf.find(prefix, self._start, self._end)
+                if idx >= 0 and (best is None or idx < best[0]):
+                    best = (idx, cmd)
+            if best is None:
+                # Keep a tail that may be the start of a split header.
+                keep = max(len(prefix) for prefix, _ in prefixes) - 1
+                self._start = max(self._start, self._end - keep)
+                return None
+            idx, cmd = best
+            self._start = idx
+            end = idx + cmd.response_len
+            if end > self._end:
+                return None
+            frame = self._view[idx:end]
+            if valid_checksum(frame):
+                self._start = end
+                return cmd, frame
+            _LOGGER.debug("Bad checksum in response to %s", cmd.__name__)
+            self._start = idx + 1
@@ -0,0 +1,272 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .commands import TurnON, TurnOFF
+from .exceptions import DeviceBusy
+from .light import AbstractLight, RemoteLight
+from . import modes
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _name(light) -> str:
+    # Not repr(light), which may query the bulb.
+    target = getattr(light, "_target", None)
+    return target() if target is not None else object.__repr__(light)
+
+
+@dataclass
+class GroupResult:
+    """Outcome of a group operation on a single light."""
+
+    light: AbstractLight
+    result: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class LightGroup:
+    """Apply the same operation to many lights in parallel.
+
+    Each light is driven by one worker thread at a time, so a slow or
+    unreachable bulb does not hold up the rest. `timeout` is a deadline in
+    seconds for the whole batch; lights that have not finished by then get
+    a `TimeoutError` in their result. A call that timed out may still be
+    running, so until it finishes, later calls skip that light and report
+    `DeviceBusy` for it.
+
+    >>> group = LightGroup(lights, timeout=2)
+    >>> results = group.set_rgb((255, 0, 0))
+    >>> failed = [r.light for r in results if not r.ok]
+    """
+
+    def __init__(
+        self,
+        lights: Iterable[AbstractLight],
+        max_workers: int = 32,
+        timeout: Optional[float] = None,
+    ):
+        self.lights = list(lights)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._busy: Dict[int, Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="magichue-group"
+        )
+
+    def __repr__(self):
+        return "<LightGroup: %d lights>" % len(self.lights)
+
+    def __len__(self):
+        return len(self.lights)
+
+    def __iter__(self):
+        return iter(self.lights)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def apply(
+        self,
+        func: Callable[[AbstractLight], Any],
+        timeout: Optional[float] = None,
+    ) -> List[GroupResult]:
+        """Call `func(light)` for every light and collect the results.
+
+        Results are returned in the same order as `self.lights`."""
+        return self._run([(light, func) for light in self.lights], timeout)
+
+    def _run(self, calls, timeout: Optional[float]) -> List[GroupResult]:
+        if timeout is None:
+            timeout = self.timeout
+        futures = []
+        with self._lock:
+            for light, func in calls:
+                running = self._busy.get(id(light))
+                if running is not None and not running.done():
+                    futures.append(None)
+                    continue
+                future = self._executor.submit(func, light)
+                self._busy[id(light)] = future
+                futures.append(future)
+        _, not_done = wait([f for f in futures if f is not None], timeout=timeout)
+        results = []
+        for (light, _), future in zip(calls, futures):
+            if future is None:
+                error = DeviceBusy(
+                    "%s is still busy with an earlier call" % _name(light)
+                )
+                results.append(GroupResult(light, error=error))
+            elif future in not_done:
+                future.cancel()
+                error = TimeoutError(
+                    "%s did not finish within %ss" % (_name(light), timeout)
+                )
+                results.append(GroupResult(light, error=error))
+            elif future.exception() is not None:
+                _LOGGER.debug("%s failed: %r", _name(light), future.exception())
+                results.append(GroupResult(light, error=future.exception()))
+            else:
+                results.append(GroupResult(light, result=future.result()))
+        return results
+
+    def turn_on(self, timeout: Optional[float] = None) -> List[GroupResult]:
+        return self.apply(lambda light: light.turn_on(), timeout)
+
+    def turn_off(self, timeout: Optional[float] = None) -> List[GroupResult]:
+        return self.apply(lambda light: light.turn_off(), timeout)
+
+    def update_status(self, timeout: Optional[float] = None) -> List[GroupResult]:
+        return self.apply(lambda light: light.update_status(), timeout)
+
+    def set_on(self, value: bool, timeout: Optional[float] = None):
+        if not isinstance(value, bool):
+            raise ValueError("Invalid value: Should be True or False")
+        return self.turn_on(timeout) if value else self.turn_off(timeout)
+
+    def set_rgb(self, rgb, timeout: Optional[float] = None) -> List[GroupResult]:
+        rgb = tuple(rgb)
+
+        def _set(light):
+            light.rgb = rgb
+
+        return self.apply(_set, timeout)
+
+    def set_colors(self, colors, timeout: Optional[float] = None) -> List[GroupResult]:
+        """Set one rgb color per light, e.g. from `magichue.color.gradient`."""
+        colors = [tuple(rgb) for rgb in colors]
+        if len(colors) != len(self.lights):
+            raise ValueError(
+                "Expected %d colors, got %d" % (len(self.lights), len(colors))
+            )
+
+        def setter(rgb):
+            def _set(light):
+                light.rgb = rgb
+
+            return _set
+
+        calls = [(light, setter(rgb)) for light, rgb in zip(self.lights, colors)]
+        return self._run(calls, timeout)
+
+    def set_mode(self, mode, timeout: Optional[float] = None) -> List[GroupResult]:
+        if not isinstance(mode, modes.Mode):
+            raise ValueError("Invalid value: value must be a instance of Mode")
+
+        def _set(light):
+            light.mode = mode
+
+        return self.apply(_set, timeout)
+
+
+class RemoteLightGroup:
+    """Change many RemoteLights of one account with batched API calls.
+
+    Every operation packs the commands for all lights into
+    `RemoteAPI.send_command_batch`, so a scene change costs a single
+    request (or one per `max_batch_size` lights).
+
+    >>> group = RemoteLightGroup(api, api.get_online_bulbs())
+    >>> group.set_rgb((255, 0, 0))
+    """
+
+    def __init__(self, api, lights: Iterable[RemoteLight]):
+        self.api = api
+        self.lights = list(lights)
+
+    def __repr__(self):
+        return "<RemoteLightGroup: %d lights>" % len(self.lights)
+
+    def __len__(self):
+        return len(self.lights)
+
+    def __iter__(self):
+        return iter(self.lights)
+
+    def _send(self, items, sent: Callable[[RemoteLight], Any]) -> List[dict]:
+        """Send (light, command) pairs, one request per `max_batch_size`.
+
+        `sent(light)` is called once every command of `light` has been
+        accepted, so a failed request leaves the status of its lights alone.
+        """
+        last = {id(light): i for i, (light, _) in enumerate(items)}
+        size = self.api.max_batch_size
+        results = []
+        for start in range(0, len(items), size):
+            chunk = items[start : start + size]
+            results.extend(
+                self.api.send_command_batch(
+                    [(light.macaddr, cmd) for light, cmd in chunk], size
+                )
+            )
+            for i, (light, _) in enumerate(chunk, start):
+                if last[id(light)] == i:
+                    sent(light)
+        return results
+
+    def turn_on(self) -> List[dict]:
+        def sent(light):
+            light.status.on = True
+
+        return self._send([(light, TurnON) for light in self.lights], sent)
+
+    def turn_off(self) -> List[dict]:
+        def sent(light):
+            light.status.on = False
+
+        return self._send([(light, TurnOFF) for light in self.lights], sent)
+
+    def set_on(self, value: bool) -> List[dict]:
+        if not isinstance(value, bool):
+            raise ValueError("Invalid value: Should be True or False")
+        return self.turn_on() if value else self.turn_off()
+
+    def set_rgb(self, rgb) -> List[dict]:
+        return self.set_colors([rgb] * len(self.lights))
+
+    def set_colors(self, colors) -> List[dict]:
+        """Set one rgb color per light, e.g. from `magichue.color.gradient`."""
+        colors = [tuple(rgb) for rgb in colors]
+        if len(colors) != len(self.lights):
+            raise ValueError(
+                "Expected %d colors, got %d" % (len(self.lights), len(colors))
+            )
+        # Frames are built from copies, so that the status of a light only
+        # changes once its frames have been sent.
+        targets = {}
+        items = []
+        for light, rgb in zip(self.lights, colors):
+            status = light.status.copy()
+            status.update_rgb(rgb)
+            targets[id(light)] = status.rgb()
+            items.extend((light, cmd) for cmd in light._status_frames(status))
+
+        def sent(light):
+            light.status.update_rgb(targets[id(light)])
+
+        return self._send(items, sent)
+
+    def set_mode(self, mode) -> List[dict]:
+        if not isinstance(mode, modes.Mode):
+            raise ValueError("Invalid value: value must be a instance of Mode")
+        frame = mode.frame()
+
+        def sent(light):
+            if isinstance(mode, modes.CustomMode):
+                light.status.speed = mode.speed
+            light.status.mode = mode
+
+        return self._send([(light, frame) for light in self.lights], sent)
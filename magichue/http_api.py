@@ -1,20 +1,25 @@
 import random
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import json
 from dataclasses import dataclass
 from string import ascii_uppercase, digits
-from typing import List
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .light import RemoteLight
-from .commands import Command
+from .commands import Command, QueryStatus
+from .magichue import Status
 from .exceptions import HTTPError, MagicHueAPIError
+from .instrument import CommandEvent, Instrument, run_instrumented
 
 
 API_BASE = "https://wifij01us.magichue.net/app"
 UA = "Magic Hue/1.2.2 (IOS,13.400000,ja_JP)"
+DEFAULT_TIMEOUT = 10
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,10 +33,67 @@ class RemoteDevice:
     local_ip: str
     state_str: str
 
+    def status(self) -> Optional[Status]:
+        """Status decoded from `state_str`, or None if it can't be decoded."""
+        try:
+            data = bytes.fromhex(self.state_str or "")
+        except ValueError:
+            return None
+        if len(data) != QueryStatus.response_len or data[0] != QueryStatus.array[0]:
+            return None
+        status = Status()
+        status.parse(data)
+        return status
+
+
+def make_session(pool_size: int = 10) -> requests.Session:
+    """Make a keep-alive session holding up to `pool_size` connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": UA})
+    return session
+
 
 class RemoteAPI:
-    def __init__(self, token):
+
+    MAX_BATCH_SIZE = 50
+
+    # Hooks called around every API request; see magichue.instrument.
+    instruments: Sequence[Instrument] = ()
+
+    def __init__(
+        self,
+        token,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        session: Optional[requests.Session] = None,
+        pool_size: int = 10,
+        timeout: float = DEFAULT_TIMEOUT,
+        api_base: Optional[str] = None,
+    ):
         self.token = token
+        self.max_batch_size = max_batch_size
+        self.session = session if session is not None else make_session(pool_size)
+        self.timeout = timeout
+        self._api_base = api_base
+
+    @property
+    def api_base(self) -> str:
+        return self._api_base or API_BASE
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_instrument(self, instrument: Instrument):
+        """Attach `instrument` to this API object only."""
+        self.instruments = (*self.instruments, instrument)
 
     @staticmethod
     def sanitize_json_text(text: str) -> str:
@@ -55,7 +117,15 @@ class RemoteAPI:
         return _decoded
 
     @classmethod
-    def auth(cls, user: str, password: str, client_id: str = ""):
+    def auth(
+        cls,
+        user: str,
+        password: str,
+        client_id: str = "",
+        session: Optional[requests.Session] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        api_base: Optional[str] = None,
+    ):
         if not client_id:
             client_id = "".join(
                 [random.choice(ascii_uppercase + digits) for _ in range(32)]
@@ -65,9 +135,13 @@ class RemoteAPI:
             "password": hashlib.md5(password.encode("utf8")).hexdigest(),
             "clientID": client_id,
         }
-        _LOGGER.debug("Logging in with email {}".format(user))
-        res = requests.post(
-            API_BASE + "/login/MagicHue", json=payload, headers={"User-Agent": UA}
+        _LOGGER.debug("Logging in with email %s", user)
+        post = session.post if session is not None else requests.post
+        res = post(
+            (api_base or API_BASE) + "/login/MagicHue",
+            json=payload,
+            headers={"User-Agent": UA},
+            timeout=timeout,
         )
 
         res_dict = cls.handle_api_response(res)
@@ -75,48 +149,52 @@ class RemoteAPI:
         return res_dict.get("token")
 
     @classmethod
-    def login_with_user_password(cls, user: str, password: str, client_id: str = ""):
-        token = cls.auth(user, password, client_id)
-        return RemoteAPI(token=token)
+    def login_with_user_password(
+        cls, user: str, password: str, client_id: str = "", **kwargs
+    ):
+        if kwargs.get("session") is None:
+            kwargs["session"] = make_session(kwargs.get("pool_size", 10))
+        token = cls.auth(
+            user,
+            password,
+            client_id,
+            session=kwargs["session"],
+            timeout=kwargs.get("timeout", DEFAULT_TIMEOUT),
+            api_base=kwargs.get("api_base"),
+        )
+        return RemoteAPI(token=token, **kwargs)
 
     @classmethod
-    def login_with_token(cls, token: str):
-        return RemoteAPI(token)
+    def login_with_token(cls, token: str, **kwargs):
+        return RemoteAPI(token, **kwargs)
 
     def _post_with_token(self, endpoint, payload):
-        _LOGGER.debug(
-            "Sending POST request to {}, payload={}".format(
-                endpoint,
-                payload,
-            )
-        )
-        res = requests.post(
-            API_BASE + endpoint,
-            json=payload,
-            headers={"User-Agent": UA, "token": self.token},
-        )
-        _LOGGER.debug(
-            "Got response({}): {}".format(
-                res.status_code,
-                res.text,
-            )
-        )
-        res_dict = RemoteAPI.handle_api_response(res)
-        return res_dict
+        _LOGGER.debug("Sending POST request to %s, payload=%s", endpoint, payload)
+        return self._request("POST", endpoint, payload)
 
     def _get_with_token(self, endpoint):
-        _LOGGER.debug("Sending GET request to {}".format(endpoint))
-        res = requests.get(
-            API_BASE + endpoint, headers={"User-Agent": UA, "token": self.token}
-        )
-        _LOGGER.debug(
-            "Got response({}): {}".format(
-                res.status_code,
-                res.text,
+        _LOGGER.debug("Sending GET request to %s", endpoint)
+        return self._request("GET", endpoint)
+
+    def _request(self, method: str, endpoint: str, payload=None):
+        def send(event: Optional[CommandEvent]):
+            res = self.session.request(
+                method,
+                self.api_base + endpoint,
+                json=payload,
+                headers={"User-Agent": UA, "token": self.token},
+                timeout=self.timeout,
             )
-        )
-        res_dict = RemoteAPI.handle_api_response(res)
-        return res_dict
+            if event is not None:
+                event.size = len(res.request.body or b"")
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Got response(%s): %s", res.status_code, res.text)
+            return RemoteAPI.handle_api_response(res)
+
+        if not self.instruments:
+            return send(None)
+        event = CommandEvent(target=self.api_base, command=endpoint, size=0)
+        return run_instrumented(self.instruments, event, send)
 
     def _send_request(self, cmd: Command, macaddr: str):
         payload = {
@@ -128,24 +206,61 @@ class RemoteAPI:
         return result["data"]
 
     def _send_command(self, cmd: Command, macaddr: str):
-        payload = {
-            "dataCommandItems": [{"hexData": cmd.hex_string(), "macAddress": macaddr}]
-        }
-        result = self._post_with_token("/sendCommandBatch/MagicHue", payload)
-        return result
+        return self.send_command_batch([(macaddr, cmd)])[0]
 
-    def get_online_bulbs(self, online_only=True) -> List[RemoteLight]:
-        devices = self.get_online_devices(online_only=online_only)
-        bulbs = [
-            RemoteLight(api=self, macaddr=dev.macaddr)
-            for dev in devices
+    def send_command_batch(
+        self,
+        items: Iterable[Tuple[str, Command]],
+        batch_size: Optional[int] = None,
+    ) -> List[dict]:
+        """Send many (macaddr, command) pairs with as few requests as possible.
+
+        Items are sent in order, at most `batch_size` (default:
+        `max_batch_size`) per request. Returns the response of each request.
+        """
+        if batch_size is None:
+            batch_size = self.max_batch_size
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        command_items = [
+            {"hexData": cmd.hex_string(), "macAddress": macaddr}
+            for macaddr, cmd in items
         ]
-        return bulbs
+        results = []
+        for i in range(0, len(command_items), batch_size):
+            payload = {"dataCommandItems": command_items[i : i + batch_size]}
+            result = self._post_with_token("/sendCommandBatch/MagicHue", payload)
+            results.append(result)
+        return results
+
+    def get_online_bulbs(
+        self,
+        online_only=True,
+        max_workers: int = 1,
+        use_device_state: bool = False,
+    ) -> List[RemoteLight]:
+        """Make a RemoteLight for every bound device.
+
+        With `use_device_state`, each light starts from the state returned by
+        the device list instead of asking the bulb, and only bulbs whose state
+        can't be decoded are queried. Queries run on up to `max_workers`
+        threads at once.
+        """
+        devices = self.get_online_devices(online_only=online_only)
+
+        def make_bulb(dev):
+            status = dev.status() if use_device_state else None
+            return RemoteLight(api=self, macaddr=dev.macaddr, status=status)
+
+        if max_workers <= 1 or len(devices) <= 1:
+            return [make_bulb(dev) for dev in devices]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(make_bulb, devices))
 
     def get_online_devices(self, online_only=True) -> List[RemoteDevice]:
         result = self._get_with_token("/getMyBindDevicesAndState/MagicHue")
         arr = result.get("data")
-        _LOGGER.debug("Found {} devices".format(len(arr)))
+        _LOGGER.debug("Found %d devices", len(arr))
         devices = []
         for dev_dict in arr:
             if online_only and not dev_dict.get("isOnline"):
@@ -0,0 +1,185 @@
+"""Hooks around every command sent, and an in-memory metrics collector.
+
+Instruments are attached to a single light or API object, or to every
+light at once through the class attribute:
+
+>>> metrics = MetricsCollector()
+>>> AbstractLight.instruments = [metrics]
+>>> ...
+>>> metrics.slowest(5)
+[('192.168.0.23', 0.25), ...]
+"""
+
+import bisect
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class CommandEvent:
+    """One command (or HTTP request) sent to `target`.
+
+    `latency`, `retries` and `error` are filled in by the time `after_send`
+    is called.
+    """
+
+    target: str
+    command: str
+    size: int
+    start: float = field(default_factory=time.perf_counter)
+    latency: Optional[float] = None
+    retries: int = 0
+    error: Optional[BaseException] = None
+
+
+class Instrument:
+    """Base class for hooks; override the ones you need.
+
+    Hooks run on the sending thread, so they should be quick. Exceptions
+    raised by hooks are logged and otherwise ignored.
+    """
+
+    def before_send(self, event: CommandEvent):
+        pass
+
+    def after_send(self, event: CommandEvent):
+        pass
+
+
+def _call(instruments: Sequence[Instrument], hook: str, event: CommandEvent):
+    for instrument in instruments:
+        try:
+            getattr(instrument, hook)(event)
+        except Exception:
+            _LOGGER.exception("Instrument %r failed in %s", instrument, hook)
+
+
+def run_instrumented(instruments: Sequence[Instrument], event: CommandEvent, func):
+    """Call `func(event)` between the `before_send` and `after_send` hooks."""
+    _call(instruments, "before_send", event)
+    try:
+        return func(event)
+    except BaseException as e:
+        event.error = e
+        raise
+    finally:
+        event.latency = time.perf_counter() - event.start
+        _call(instruments, "after_send", event)
+
+
+class Histogram:
+    """Counts of values falling at or under each bucket's upper bound."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last: over every bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the `q` (0-1) quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*self.buckets, float("inf")], self.counts)),
+        }
+
+
+class _Stats:
+    def __init__(self, buckets):
+        self.sent = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency = Histogram(buckets)
+
+    def add(self, event: CommandEvent):
+        self.sent += 1
+        self.errors += event.error is not None
+        self.retries += event.retries
+        self.bytes += event.size
+        self.latency.add(event.latency)
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class MetricsCollector(Instrument):
+    """Counters and latency histograms per command name and per target."""
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.commands: Dict[str, _Stats] = {}
+            self.targets: Dict[str, _Stats] = {}
+
+    def after_send(self, event: CommandEvent):
+        with self._lock:
+            for stats, key in (
+                (self.commands, event.command),
+                (self.targets, event.target),
+            ):
+                if key not in stats:
+                    stats[key] = _Stats(self.buckets)
+                stats[key].add(event)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "commands": {k: v.as_dict() for k, v in self.commands.items()},
+                "targets": {k: v.as_dict() for k, v in self.targets.items()},
+            }
+
+    def slowest(self, n: int = 10, q: float = 0.95) -> List[Tuple[str, float]]:
+        """The `n` targets with the highest `q` latency quantile."""
+        with self._lock:
+            ranked = [
+                (target, stats.latency.quantile(q))
+                for target, stats in self.targets.items()
+            ]
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked[:n]
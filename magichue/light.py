@@ -1,12 +1,24 @@
 from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
 from datetime import datetime
-import struct
 import socket
-import select
 import colorsys
 import logging
-
-from .commands import Command, TurnON, TurnOFF, QueryStatus, QueryCurrentTime
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from .commands import (
+    Command,
+    CommandFrame,
+    TurnON,
+    TurnOFF,
+    QueryStatus,
+    QueryCurrentTime,
+    QueryTimers,
+    QueryCustomMode,
+)
 from .exceptions import (
     InvalidData,
     DeviceOffline,
@@ -17,11 +29,25 @@ from .magichue import Status
 from . import modes
 from . import bulb_types
 from . import utils
+from .stream import StreamStats, stream_colors, astream_colors
+from .connection import ConnectionPool
+from .framing import FrameDecoder, valid_checksum
+from .instrument import CommandEvent, Instrument, run_instrumented
 
 
 _LOGGER = logging.getLogger(__name__)
 
 
+@dataclass
+class DeviceSnapshot:
+    """Status, clock, timers and custom mode of a bulb, read in one go."""
+
+    status: Status
+    current_time: datetime
+    timers: tuple
+    custom_mode: tuple
+
+
 class AbstractLight(metaclass=ABCMeta):
     """An abstract class of MagicHue Light."""
 
@@ -29,10 +55,31 @@ class AbstractLight(metaclass=ABCMeta):
 
     status: Status
     allow_fading: bool = True
+    _status_loaded: bool = True
+    # Known without a query: set when a status or bulb type is passed in.
+    _bulb_type_known: bool = True
+    _batch_depth: int = 0
+    _power_set: bool = False  # turn_on/turn_off called inside a batch
+    _color_set: bool = False  # color changed inside a batch
+    _batch_snapshot: Optional[Status] = None  # status to restore on error
+
+    # Skip frames identical to the last one sent, for up to dedup_ttl
+    # seconds (forever if None).
+    dedup: bool = False
+    dedup_ttl: Optional[float] = None
+    frames_sent: int = 0
+    frames_suppressed: int = 0
+
+    # Hooks called around every command sent; see magichue.instrument.
+    # Set on AbstractLight to watch every light at once.
+    instruments: Sequence[Instrument] = ()
 
     def __repr__(self):
-        on = "on" if self.status.on else "off"
+        # Never queries the bulb: repr() runs in logging and debuggers.
         class_name = self.__class__.__name__
+        if not getattr(self, "_status_loaded", False):
+            return "<%s: %s (status not loaded)>" % (class_name, self._target())
+        on = "on" if self.status.on else "off"
         if self.status.mode.value != modes._NORMAL:
             return "<%s: %s (%s)>" % (class_name, on, self.status.mode.name)
         else:
@@ -57,9 +104,11 @@ class AbstractLight(metaclass=ABCMeta):
                     on,
                     *(self.status.rgb()),
                 )
+            return "<%s: %s>" % (class_name, on)
 
     @property
     def on(self):
+        self._ensure_status()
         return self.status.on
 
     @on.setter
@@ -75,82 +124,101 @@ class AbstractLight(metaclass=ABCMeta):
 
     @property
     def rgb(self):
+        self._ensure_status()
         return self.status.rgb()
 
     @rgb.setter
     def rgb(self, rgb):
+        # A full color needs only the frame layout, which the bulb type sets.
+        if not self._bulb_type_known:
+            self._ensure_status()
         self.status.update_rgb(rgb)
         self._apply_status()
 
     @property
     def r(self):
+        self._ensure_status()
         return self.status.r
 
     @r.setter
     def r(self, v):
+        self._ensure_status()
         self.status.update_r(v)
         self._apply_status()
 
     @property
     def g(self):
+        self._ensure_status()
         return self.status.g
 
     @g.setter
     def g(self, v):
+        self._ensure_status()
         self.status.update_g(v)
         self._apply_status()
 
     @property
     def b(self):
+        self._ensure_status()
         return self.status.b
 
     @b.setter
     def b(self, v):
+        self._ensure_status()
         self.status.update_b(v)
         self._apply_status()
 
     @property
     def w(self):
+        self._ensure_status()
         return self.status.w
 
     @w.setter
     def w(self, v):
+        self._ensure_status()
         self.status.update_w(v)
         self._apply_status()
 
     @property
     def cw(self):
+        self._ensure_status()
         return self.status.cw
 
     @cw.setter
     def cw(self, v):
+        self._ensure_status()
         self.status.update_cw(v)
         self._apply_status()
 
     @property
     def cww(self):
+        self._ensure_status()
         return (self.status.cw, self.status.w)
 
     @cww.setter
     def cww(self, cww):
         cw, w = cww
+        self._ensure_status()
         self.status.update_cw(cw)
         self.status.update_w(w)
         self._apply_status()
 
     @property
     def is_white(self):
+        self._ensure_status()
         return self.status.is_white
 
     @is_white.setter
     def is_white(self, v):
         if not isinstance(v, bool):
             raise ValueError("Invalid value: value must be a bool.")
+        self._ensure_status()
         self.status.is_white = v
         self._apply_status()
 
     @property
     def hue(self):
+        self._ensure_status()
         h = colorsys.rgb_to_hsv(*self.status.rgb())[0]
         return h
 
@@ -158,6 +226,7 @@ class AbstractLight(metaclass=ABCMeta):
     def hue(self, h):
         if not h <= 1:
             raise ValueError("arg must not be more than 1")
+        self._ensure_status()
         sb = colorsys.rgb_to_hsv(*self.status.rgb())[1:]
         rgb = map(int, colorsys.hsv_to_rgb(h, *sb))
         self.status.update_rgb(rgb)
@@ -165,6 +234,7 @@ class AbstractLight(metaclass=ABCMeta):
 
     @property
     def saturation(self):
+        self._ensure_status()
         s = colorsys.rgb_to_hsv(*self.status.rgb())[1]
         return s
 
@@ -172,6 +242,7 @@ class AbstractLight(metaclass=ABCMeta):
     def saturation(self, s):
         if not s <= 1:
             raise ValueError("arg must not be more than 1")
+        self._ensure_status()
         h, v = colorsys.rgb_to_hsv(*self.status.rgb())[::2]
         rgb = map(int, colorsys.hsv_to_rgb(h, s, v))
         self.status.update_rgb(rgb)
@@ -179,6 +250,7 @@ class AbstractLight(metaclass=ABCMeta):
 
     @property
     def brightness(self):
+        self._ensure_status()
         if self.is_white:
             b = self.w
         else:
@@ -187,6 +259,7 @@ class AbstractLight(metaclass=ABCMeta):
 
     @brightness.setter
     def brightness(self, v):
+        self._ensure_status()
         if self.is_white:
             self.status.update_w(v)
         else:
@@ -197,17 +270,20 @@ class AbstractLight(metaclass=ABCMeta):
 
     @property
     def speed(self):
+        self._ensure_status()
         return self.status.speed
 
     @speed.setter
     def speed(self, value):
         value = utils.round_value(value, 0, 1)
+        self._ensure_status()
         self.status.speed = value
         self.mode.speed = value
         self._set_mode(self.mode)
 
     @property
     def mode(self):
+        self._ensure_status()
         return self.status.mode
 
     @mode.setter
@@ -223,10 +299,63 @@ class AbstractLight(metaclass=ABCMeta):
     def _send_command(self, cmd: Command, send_only: bool = True):
         pass
 
+    @abstractmethod
+    def _target(self) -> str:
+        """Address of the bulb, as reported to instruments."""
+
+    def add_instrument(self, instrument: Instrument):
+        """Attach `instrument` to this light only."""
+        self.instruments = (*self.instruments, instrument)
+
+    def _instrumented(self, cmds: Sequence[Command], func):
+        """Call `func(event)`, which sends `cmds`, between instrument hooks.
+
+        `event` is None when no instruments are attached.
+        """
+        if not self.instruments:
+            return func(None)
+        event = CommandEvent(
+            target=self._target(),
+            command=",".join(cmd.__name__ for cmd in cmds),
+            size=sum(len(cmd.byte_string()) for cmd in cmds),
+        )
+        return run_instrumented(self.instruments, event, func)
+
+    def _send_commands(self, cmds: Sequence[Command]):
+        """Send several commands, as one write where the transport allows it."""
+        for cmd in cmds:
+            self._send_command(cmd)
+
+    def _send_frames(self, kind: str, frames: List[CommandFrame]):
+        """Send frames, unless they repeat the last `kind` frames sent.
+
+        `kind` is "power" for on/off and "state" for color and mode frames.
+        """
+        key = b"".join(cmd.byte_string() for cmd in frames)
+        now = time.monotonic()
+        if self.dedup:
+            last = self._last_frames.get(kind)
+            if last is not None and last[0] == key:
+                if self.dedup_ttl is None or now - last[1] < self.dedup_ttl:
+                    self._LOGGER.debug("Suppressed %s frames", kind)
+                    self.frames_suppressed += len(frames)
+                    return
+        self._send_commands(frames)
+        self.frames_sent += len(frames)
+        self._last_frames[kind] = (key, now)
+
+    def _remember_status(self):
+        """Record the frames that would reproduce the status read from the bulb."""
+        now = time.monotonic()
+        power = TurnON if self.status.on else TurnOFF
+        self._last_frames = {"power": (power.byte_string(), now)}
+        if self.status.mode.value == modes._NORMAL:
+            key = b"".join(cmd.byte_string() for cmd in self._status_frames())
+            self._last_frames["state"] = (key, now)
+
     def _set_mode(self, _mode):
         self._LOGGER.debug("_set_mode")
-        cmd = Command.from_array(_mode._make_data())
-        self._send_command(cmd)
+        self._send_frames("state", [_mode.frame()])
 
     def _get_status_data(self):
         self._LOGGER.debug("_get_status_data")
@@ -238,6 +367,10 @@ class AbstractLight(metaclass=ABCMeta):
         self._LOGGER.debug("get_current_time")
 
         data = self._send_command(QueryCurrentTime, send_only=False)
+        return self._parse_time(data)
+
+    @staticmethod
+    def _parse_time(data) -> datetime:
         bulb_date = datetime(
             data[3] + 2000,  # Year
             data[4],  # Month
@@ -251,70 +384,213 @@ class AbstractLight(metaclass=ABCMeta):
     def turn_on(self):
         """Trun bulb power on"""
         self._LOGGER.debug("turn_on")
-        self._send_command(TurnON)
+        if self._batch_depth:
+            self._power_set = True
+        else:
+            self._send_frames("power", [TurnON.frame()])
         self.status.on = True
 
     def turn_off(self):
         """Trun bulb power off"""
         self._LOGGER.debug("turn_off")
-        self._send_command(TurnOFF)
+        if self._batch_depth:
+            self._power_set = True
+        else:
+            self._send_frames("power", [TurnOFF.frame()])
         self.status.on = False
 
+    @contextmanager
+    def batch(self):
+        """Merge every change made inside the block into one frame.
+
+        >>> with light.batch():
+        ...     light.r = 255
+        ...     light.g = 0
+        ...     light.b = 0
+
+        Nothing is sent if the status ends up unchanged. If the block raises
+        an exception, nothing is sent and the status is restored.
+        """
+        if self._batch_depth:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            return
+        # The status of a light never loaded is unknown (a default, or a
+        # cached hint), so every requested change is sent.
+        loaded = self._status_loaded
+        before_on = self.status.on
+        before_data = self.status.make_data()
+        self._batch_snapshot = self.status.copy()
+        self._batch_depth = 1
+        self._power_set = self._color_set = False
+        try:
+            yield self
+        except BaseException:
+            snapshot = self._batch_snapshot
+            for name in Status.__slots__:
+                setattr(self.status, name, getattr(snapshot, name))
+            raise
+        finally:
+            self._batch_depth = 0
+            self._batch_snapshot = None
+        power_changed = self.status.on != before_on or (
+            self._power_set and not loaded
+        )
+        if power_changed and self.status.on:
+            self.turn_on()
+        if self.status.make_data() != before_data or (
+            self._color_set and not loaded
+        ):
+            self._apply_status()
+        if power_changed and not self.status.on:
+            self.turn_off()
+
+    def update(
+        self,
+        r=None,
+        g=None,
+        b=None,
+        w=None,
+        cw=None,
+        is_white: Optional[bool] = None,
+        on: Optional[bool] = None,
+    ):
+        """Change several attributes at once, sending at most one color frame."""
+        with self.batch():
+            if r is not None and g is not None and b is not None:
+                self.rgb = (r, g, b)
+            else:
+                if r is not None:
+                    self.r = r
+                if g is not None:
+                    self.g = g
+                if b is not None:
+                    self.b = b
+            if w is not None:
+                self.w = w
+            if cw is not None:
+                self.cw = cw
+            if is_white is not None:
+                self.is_white = is_white
+            if on is not None:
+                self.on = on
+
     def update_status(self):
         """Sync local status with bulb"""
         self._update_status()
 
     def _update_status(self):
         data = self._get_status_data()
+        on = self.status.on
         self.status.parse(data)
+        if self._batch_depth:
+            # What the bulb really has is what a failed batch goes back to.
+            self._batch_snapshot = self.status.copy()
+        if self._batch_depth and self._power_set:
+            # Keep the power change made earlier in this batch; it is sent
+            # when the batch ends.
+            self.status.on = on
+        self._status_loaded = True
+        self._remember_status()
+
+    def _init_status(
+        self, status: Optional[Status], lazy: bool, bulb_type: Optional[int] = None
+    ):
+        self._last_frames = {}
+        if status is not None:
+            self.status = status
+            self._status_loaded = True
+            return
+        self._status_loaded = False
+        if bulb_type is not None:
+            self.status = Status(is_white=False)
+            self.status.bulb_type = bulb_type
+        else:
+            self.status = Status()
+            self._bulb_type_known = False
+        if not lazy:
+            self._update_status()
+
+    def _ensure_status(self):
+        """Fetch status from the bulb if it has never been loaded."""
+        if not self._status_loaded:
+            self._update_status()
+
+    def _status_frames(self, status: Optional[Status] = None) -> List[CommandFrame]:
+        """Frames that bring the bulb to `status` (default: the local status)."""
+        if status is None:
+            status = self.status
+        frames = []
+        if not self.allow_fading:
+            frames.append(modes.jump_frame(status.rgb()))
+        frames.append(CommandFrame(status.make_data(), name="SetColor", idempotent=True))
+        return frames
 
     def _apply_status(self):
+        if self._batch_depth:
+            self._color_set = True
+            return
         self._LOGGER.debug("_apply_status")
-        data = self.status.make_data()
-        if not self.allow_fading:
-            self._LOGGER.debug("allow_fading is False")
-            c = modes.CustomMode(mode=modes.MODE_JUMP, speed=0.1, colors=[self.rgb])
-            self._set_mode(c)
-        cmd = Command.from_array(data)
-        self._send_command(cmd)
+        self._send_frames("state", self._status_frames())
 
 
 class RemoteLight(AbstractLight):
 
     _LOGGER = logging.getLogger(__name__ + ".RemoteLight")
 
-    def __init__(self, api, macaddr: str, allow_fading: bool = True):
+    def __init__(
+        self,
+        api,
+        macaddr: str,
+        allow_fading: bool = True,
+        status: Optional[Status] = None,
+        lazy: bool = False,
+        bulb_type: Optional[int] = None,
+    ):
         self.api = api
         self.macaddr = macaddr
-        self.status = Status()
         self.allow_fading = allow_fading
-        self._update_status()
+        self._init_status(status, lazy, bulb_type)
+
+    def _target(self) -> str:
+        return self.macaddr
 
     def _send_command(self, cmd: Command, send_only: bool = True):
-        self._LOGGER.debug(
-            "Sending command({}) to: {}".format(
-                cmd.__name__,
-                self.macaddr,
-            )
+        self._LOGGER.debug("Sending command(%s) to: %s", cmd.__name__, self.macaddr)
+        return self._instrumented(
+            [cmd], lambda event: self._send_command_once(cmd, send_only)
         )
+
+    def _send_command_once(self, cmd: Command, send_only: bool):
         if send_only:
             return self.api._send_command(cmd, self.macaddr)
         else:
-            data = self.str2hexarray(self._send_request(cmd))
+            data = bytes.fromhex(self._send_request(cmd))
             if len(data) != cmd.response_len:
                 raise InvalidData(
                     "Expect length: %d, got %d\n%s"
                     % (cmd.response_len, len(data), str(data))
                 )
+            if not valid_checksum(data):
+                raise InvalidData("Bad checksum in response: %s" % str(data))
             return data
 
+    def _send_commands(self, cmds: Sequence[Command]):
+        if len(cmds) > 1:
+            items = [(self.macaddr, cmd) for cmd in cmds]
+            self._instrumented(cmds, lambda event: self.api.send_command_batch(items))
+        else:
+            super()._send_commands(cmds)
+
     def _send_request(self, cmd: Command):
         return self.api._send_request(cmd, self.macaddr)
 
     @staticmethod
     def str2hexarray(hexstr: str) -> tuple:
-        ls = [int(hexstr[i : i + 2], 16) for i in range(0, len(hexstr), 2)]
-        return tuple(ls)
+        return tuple(bytes.fromhex(hexstr))
 
 
 class LocalLight(AbstractLight):
@@ -323,77 +599,311 @@ class LocalLight(AbstractLight):
 
     port = 5577
     timeout = 1
-
-    def __init__(self, ipaddr: str, allow_fading: bool = True):
+    connect_timeout = 3
+
+    # Reconnect and resend idempotent commands after a connection failure,
+    # waiting backoff, 2 * backoff, 4 * backoff ... (at most max_backoff).
+    max_retries = 3
+    backoff = 0.1
+    max_backoff = 2.0
+
+    # Responses are read into one preallocated buffer per connection.
+    receive_buffer_size = 1024
+
+    # Kernel send buffer. Kept small so that a bulb that stops reading
+    # blocks writes (and stream() drops frames) instead of frames piling up.
+    send_buffer_size = 4096
+
+    def __init__(
+        self,
+        ipaddr: str,
+        allow_fading: bool = True,
+        status: Optional[Status] = None,
+        lazy: bool = False,
+        pool: Optional[ConnectionPool] = None,
+        reconnect: bool = True,
+        bulb_type: Optional[int] = None,
+    ):
         self.ipaddr = ipaddr
-        self._connect()
-        self.status = Status()
+        self.pool = pool
+        self.reconnect = reconnect
+        self._sock = None
+        self._lost = False
+        # One exchange on the socket at a time, e.g. a StatusPoller worker
+        # and the application.
+        self._io_lock = threading.RLock()
+        if not lazy and pool is None:
+            self._connect()
         self.allow_fading = allow_fading
-        self._update_status()
+        self._init_status(status, lazy, bulb_type)
+
+    def _target(self) -> str:
+        return self.ipaddr
 
     def _connect(self):
-        self._LOGGER.debug("Trying to make a connection with bulb(%s)" % self.ipaddr)
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._sock.settimeout(self.timeout)
-        self._sock.connect((self.ipaddr, self.port))
-        self._LOGGER.debug("Connection has been established with %s" % self.ipaddr)
+        self._LOGGER.debug("Trying to make a connection with bulb(%s)", self.ipaddr)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.connect_timeout)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+        # Frames are tiny and sent one at a time; without this, a query
+        # after a write waits for the bulb's delayed ACK.
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if hasattr(socket, "TCP_NOTSENT_LOWAT"):
+            # Writable only while nothing is waiting to be sent; see
+            # _is_writable.
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, 1)
+        try:
+            sock.connect((self.ipaddr, self.port))
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(self.timeout)
+        self._sock = sock
+        self._decoder = FrameDecoder(self.receive_buffer_size)
+        self._last_frames = {}
+        if self.pool is not None:
+            self.pool.opened(self)
+        self._LOGGER.debug("Connection has been established with %s", self.ipaddr)
+
+    def _close_socket(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def close(self):
+        """Close the connection. It is reopened when the light is used again,
+        even with reconnect=False."""
+        self._lost = False
+        self._close_socket()
+        if self.pool is not None:
+            self.pool.closed(self)
+
+    def _socket(self) -> socket.socket:
+        if self._sock is None:
+            if self._lost:
+                raise DeviceDisconnected(
+                    "Connection to %s was lost and reconnect is off" % self.ipaddr
+                )
+            self._connect()
+        return self._sock
 
     def _send(self, data):
-        self._LOGGER.debug("Trying to send data(%s) to %s" % (str(data), self.ipaddr))
-        if self._sock._closed:
+        self._LOGGER.debug("Trying to send data(%s) to %s", data, self.ipaddr)
+        sock = self._socket()
+        if sock._closed:
             raise DeviceDisconnected
-        self._sock.send(data)
+        sock.sendall(data)
 
     def _receive(self, length):
         self._LOGGER.debug(
-            "Trying to receive %d bytes data from %s" % (length, self.ipaddr)
+            "Trying to receive %d bytes data from %s", length, self.ipaddr
         )
-        if self._sock._closed:
+        sock = self._socket()
+        if sock._closed:
             raise DeviceDisconnected
 
-        data = self._sock.recv(length)
-        self._LOGGER.debug("Got %d bytes data from %s" % (len(data), self.ipaddr))
-        self._LOGGER.debug("Received data: %s" % str(data))
+        data = sock.recv(length)
+        self._LOGGER.debug("Got %d bytes data from %s", len(data), self.ipaddr)
+        self._LOGGER.debug("Received data: %s", data)
         return data
 
     def _flush_receive_buffer(self):
+        """Drop stale bytes already waiting in the socket without blocking."""
         self._LOGGER.debug("Flushing receive buffer")
-        if self._sock._closed:
+        sock = self._socket()
+        if sock._closed:
             raise DeviceDisconnected
         while True:
-            read_sock, _, _ = select.select([self._sock], [], [], self.timeout)
-            if not read_sock:
+            if not utils.ready(sock):
                 self._LOGGER.debug("Nothing received. buffer has been flushed")
                 break
             self._LOGGER.debug("There is stil something in the buffer")
-            _ = self._receive(255)
-            if not _:
+            self._decoder.clear()
+            if not sock.recv_into(self._decoder.buffer()):
                 raise DeviceDisconnected
+        self._decoder.clear()
+
+    def _is_writable(self, timeout: float = 0.0) -> bool:
+        """True if nothing written earlier is still waiting to be sent, or
+        stops waiting within `timeout` seconds.
+
+        With TCP_NOTSENT_LOWAT (Linux, macOS) this turns False as soon as
+        the bulb's receive window is full; elsewhere, once the small send
+        buffer is."""
+        sock = self._socket()
+        if sock._closed:
+            raise DeviceDisconnected
+        return utils.ready(sock, write=True, timeout=timeout)
+
+    def stream(self, colors, max_fps: float = 30.0) -> StreamStats:
+        """Send rgb colors from an iterator, at most `max_fps` per second.
+
+        Colors are taken from the iterator at that rate. While the bulb is
+        backed up, a waiting color is replaced by a newer one; the latest
+        one always wins. Returns counters of sent, dropped and late frames.
+        """
+        return stream_colors(self, colors, max_fps)
+
+    async def astream(self, colors, max_fps: float = 30.0) -> StreamStats:
+        """Like `stream`, but takes an async iterator of colors."""
+        return await astream_colors(self, colors, max_fps)
+
+    def _fill(self):
+        """Receive whatever the socket has into the frame decoder."""
+        sock = self._socket()
+        if sock._closed:
+            raise DeviceDisconnected
+        received = sock.recv_into(self._decoder.buffer())
+        if not received:
+            raise DeviceDisconnected
+        self._LOGGER.debug("Got %d bytes data from %s", received, self.ipaddr)
+        self._decoder.advance(received)
+
+    def _receive_frame(self, cmd: Command) -> memoryview:
+        """Read until a complete, valid response to `cmd` has arrived.
+
+        The result is a view of the receive buffer, valid until the next
+        receive."""
+        while True:
+            found = self._decoder.decode([cmd])
+            if found is not None:
+                return found[1]
+            self._fill()
+
+    def _send_commands(self, cmds: Sequence[Command]):
+        data = b"".join(cmd.byte_string() for cmd in cmds)
+        self._LOGGER.debug(
+            "Sending %d commands to %s: %s", len(cmds), self.ipaddr, data
+        )
+        idempotent = all(cmd.idempotent for cmd in cmds)
+        self._instrumented(
+            cmds,
+            lambda event: self._with_retry(lambda: self._send(data), idempotent, event),
+        )
 
     def _send_command(self, cmd: Command, send_only: bool = True):
+        # Copy the response before another exchange can reuse the buffer.
+        with self._io_lock:
+            response = self._send_command_view(cmd, send_only)
+            if response is not None:
+                return bytes(response)
+
+    def _send_command_view(self, cmd: Command, send_only: bool = True):
+        """Like `_send_command`, but without copying the response out of the
+        receive buffer; it stays valid until the next receive, so hold
+        `_io_lock` until it has been read."""
+        return self._instrumented(
+            [cmd],
+            lambda event: self._with_retry(
+                lambda: self._send_command_once(cmd, send_only), cmd.idempotent, event
+            ),
+        )
+
+    def _get_status_data(self):
+        return self._send_command_view(QueryStatus, send_only=False)
+
+    def _update_status(self):
+        # The status is parsed straight from the receive buffer, so no other
+        # exchange may run until it has been read.
+        with self._io_lock:
+            super()._update_status()
+
+    def _with_retry(
+        self, func, idempotent: bool = True, event: Optional[CommandEvent] = None
+    ):
+        """Run `func`, reconnecting and retrying it on connection failures.
+
+        Retries are counted in `event`, if given."""
+        with self._io_lock:
+            return self._with_retry_locked(func, idempotent, event)
+
+    def _with_retry_locked(self, func, idempotent, event):
+        attempt = 0
+        while True:
+            try:
+                if self.pool is None:
+                    return func()
+                with self.pool.checkout(self):
+                    return func()
+            except socket.timeout as e:
+                # A slow reply, not a lost connection: keep the socket. A
+                # late reply is flushed before the next query.
+                raise InvalidData(
+                    "Timed out waiting for response from %s" % self.ipaddr
+                ) from e
+            except (OSError, DeviceDisconnected) as e:
+                self.close()
+                self._lost = not self.reconnect
+                if self.reconnect and idempotent and attempt < self.max_retries:
+                    delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+                    self._LOGGER.debug(
+                        "Connection to %s failed (%r), retrying in %.2fs",
+                        self.ipaddr,
+                        e,
+                        delay,
+                    )
+                    attempt += 1
+                    if event is not None:
+                        event.retries = attempt
+                    time.sleep(delay)
+                    continue
+                raise
+
+    def query_many(self, cmds: Sequence[Command]) -> List[tuple]:
+        """Send several queries back to back and collect every response.
+
+        Responses are told apart by their header and `response_len`, so the
+        whole batch costs about one round trip. Results are in the order of
+        `cmds`.
+        """
+        cmds = list(cmds)
+        idempotent = all(c.idempotent for c in cmds)
+        return self._instrumented(
+            cmds,
+            lambda event: self._with_retry(
+                lambda: self._query_many_once(cmds), idempotent, event
+            ),
+        )
+
+    def _query_many_once(self, cmds: List[Command]) -> List[tuple]:
+        self._flush_receive_buffer()
+        self._send(b"".join(cmd.byte_string() for cmd in cmds))
+        results = [None] * len(cmds)
+        pending = list(enumerate(cmds))
+        while pending:
+            found = self._decoder.decode([cmd for _, cmd in pending])
+            if found is None:
+                self._fill()
+                continue
+            cmd, frame = found
+            item = next(item for item in pending if item[1] is cmd)
+            results[item[0]] = tuple(frame)
+            pending.remove(item)
+        return results
+
+    def snapshot(self) -> "DeviceSnapshot":
+        """Read status, clock, timers and custom mode in one round trip."""
+        status, clock, timers, custom = self.query_many(
+            [QueryStatus, QueryCurrentTime, QueryTimers, QueryCustomMode]
+        )
+        self.status.parse(status)
+        self._status_loaded = True
+        self._remember_status()
+        return DeviceSnapshot(
+            status=self.status,
+            current_time=self._parse_time(clock),
+            timers=timers,
+            custom_mode=custom,
+        )
+
+    def _send_command_once(self, cmd: Command, send_only: bool):
+        frame = cmd.byte_string()
         self._LOGGER.debug(
-            "Sending command({}) to {}: {}".format(
-                cmd.__name__,
-                self.ipaddr,
-                cmd.byte_string(),
-            )
+            "Sending command(%s) to %s: %s", cmd.__name__, self.ipaddr, frame
         )
         if send_only:
-            self._send(cmd.byte_string())
+            self._send(frame)
         else:
             self._flush_receive_buffer()
-            self._send(cmd.byte_string())
-            data = self._receive(cmd.response_len)
-            decoded_data = struct.unpack("!%dB" % len(data), data)
-            if len(data) == cmd.response_len:
-                return decoded_data
-            else:
-                raise InvalidData(
-                    "Expect length: %d, got %d\n%s"
-                    % (cmd.response_len, len(decoded_data), str(decoded_data))
-                )
-
-    def _connect(self, timeout=3):
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._sock.settimeout(timeout)
-        self._sock.connect((self.ipaddr, self.port))
+            self._send(frame)
+            return self._receive_frame(cmd)
@@ -1,5 +1,4 @@
 import socket
-import select
 import struct
 import colorsys
 
@@ -16,6 +15,21 @@ class Status(object):
     ON = 0x23
     OFF = 0x24
 
+    # Telemetry keeps many statuses around, so they carry no __dict__.
+    __slots__ = (
+        "r",
+        "g",
+        "b",
+        "w",
+        "cw",
+        "is_white",
+        "on",
+        "speed",
+        "mode",
+        "bulb_type",
+        "version",
+    )
+
     def __init__(self, r=0, g=0, b=0, w=0, cw=0, is_white=True, on=True):
         self.r = r
         self.g = g
@@ -58,21 +72,54 @@ class Status(object):
     def rgb(self):
         return (self.r, self.g, self.b)
 
+    def copy(self) -> "Status":
+        """A shallow copy, field by field."""
+        copy = Status.__new__(Status)
+        for name in Status.__slots__:
+            setattr(copy, name, getattr(self, name))
+        return copy
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Make a Status from a QueryStatus response."""
+        status = cls()
+        status.parse(data)
+        return status
+
     def parse(self, data):
+        """Read a QueryStatus response from any buffer, without copying it."""
         if data[0] != 0x81:
             return
         self.bulb_type = data[1]
         self.on = data[2] == commands.ON
-        mode_value = data[3]
-        self.r, self.g, self.b, self.w = data[6:10]
+        self.mode = modes.get_mode(data[3])
+        self.speed = utils.slowness2speed(data[5])
+        self.r = data[6]
+        self.g = data[7]
+        self.b = data[8]
+        self.w = data[9]
         self.version = data[10]
         self.cw = data[11]
         self.is_white = data[12] == commands.TRUE
-        self.mode = modes._VALUE_TO_MODE.get(
-            mode_value, modes.Mode(mode_value, 1, "UNKOWN")
-        )
-        slowness = data[5]
-        self.speed = utils.slowness2speed(slowness)
+
+    def dump(self):
+        """Encode as a QueryStatus response, the inverse of `parse`."""
+        data = [
+            0x81,
+            self.bulb_type,
+            commands.ON if self.on else commands.OFF,
+            self.mode.number,
+            0x00,  # not read by parse
+            utils.speed2slowness(self.speed),
+            self.r,
+            self.g,
+            self.b,
+            self.w,
+            self.version,
+            self.cw,
+            commands.TRUE if self.is_white else commands.FALSE,
+        ]
+        return bytes(data + [sum(data) & 0xFF])
 
     def make_data(self):
         is_white = 0x0F if self.is_white else 0xF0
@@ -173,22 +220,29 @@ class Light(object):
             response = self._receive(response_len)
             return response
 
+    def _send_frame(self, frame, response_len, receive=True):
+        self._send(frame.byte_string())
+        if receive:
+            response = self._receive(response_len)
+            return response
+
     def _turn_on(self):
-        on_data = [commands.TURN_ON_1, commands.TURN_ON_2, commands.TURN_ON_3]
-        return self._send_with_checksum(
-            on_data, commands.RESPONSE_LEN_POWER, receive=self.confirm_receive_on_send
+        return self._send_frame(
+            commands.TurnON.frame(),
+            commands.RESPONSE_LEN_POWER,
+            receive=self.confirm_receive_on_send,
         )
 
     def _turn_off(self):
-        off_data = [commands.TURN_OFF_1, commands.TURN_OFF_2, commands.TURN_OFF_3]
-        return self._send_with_checksum(
-            off_data, commands.RESPONSE_LEN_POWER, receive=self.confirm_receive_on_send
+        return self._send_frame(
+            commands.TurnOFF.frame(),
+            commands.RESPONSE_LEN_POWER,
+            receive=self.confirm_receive_on_send,
         )
 
     def _flush_receive_buffer(self, timeout=0.2):
         while True:
-            read_sock, _, _ = select.select([self._sock], [], [], timeout)
-            if not read_sock:
+            if not utils.ready(self._sock, timeout=timeout):
                 break
             _ = self._sock.recv(255)
 
@@ -209,14 +263,8 @@ class Light(object):
 
     def _get_status_data(self):
         self._flush_receive_buffer()
-        cmd = [
-            commands.QUERY_STATUS_1,
-            commands.QUERY_STATUS_2,
-            commands.QUERY_STATUS_3,
-        ]
-
-        raw_data = self._send_with_checksum(
-            cmd,
+        raw_data = self._send_frame(
+            commands.QueryStatus.frame(),
             commands.RESPONSE_LEN_QUERY_STATUS,
         )
         data = struct.unpack("!%dB" % commands.RESPONSE_LEN_QUERY_STATUS, raw_data)
@@ -232,12 +280,7 @@ class Light(object):
     def _apply_status(self):
         data = self._status.make_data()
         if not self.allow_fading:
-            c = modes.CustomMode(
-                mode=modes.MODE_JUMP,
-                speed=0.1,
-                colors=[(self._status.r, self._status.g, self._status.b)],
-            )
-            self._set_mode(c)
+            self._send_frame(modes.jump_frame(self._status.rgb()), 0, receive=False)
         self._send_with_checksum(
             data, commands.RESPONSE_LEN_SET_COLOR, receive=self.confirm_receive_on_send
         )
@@ -425,6 +468,6 @@ class Light(object):
     def _set_mode(self, mode):
         mode.speed = self.speed
         self._status.mode = mode
-        self._send_with_checksum(
-            mode._make_data(), mode.RESPONSE_LEN, receive=self.confirm_receive_on_send
+        self._send_frame(
+            mode.frame(), mode.RESPONSE_LEN, receive=self.confirm_receive_on_send
         )
@@ -1,4 +1,6 @@
 from .commands import (
+    CommandFrame,
+    cached_frame,
     CHANGE_MODE,
     CUSTOM_MODE,
     CUSTOM_MODE_TERMINATOR_1,
@@ -7,6 +9,8 @@ from .commands import (
     RESPONSE_LEN_CUSTOM_MODE,
 )
 
+from functools import lru_cache
+
 from .utils import speed2slowness
 
 
@@ -46,6 +50,8 @@ class Mode:
 
     RESPONSE_LEN = RESPONSE_LEN_CHANGE_MODE
 
+    __slots__ = ("value", "speed", "name")
+
     def __repr__(self):
         return "<Mode: {}>".format(self._status_text())
 
@@ -57,16 +63,34 @@ class Mode:
         self.speed = speed
         self.name = name
 
+    @property
+    def number(self) -> int:
+        """Mode number as sent by the bulb. (CustomMode.value is CUSTOM.)"""
+        value = self.value
+        while isinstance(value, Mode):
+            value = value.value
+        return value
+
     def _make_data(self):  # slowness is a integer value 1 to 49
         slowness = speed2slowness(self.speed)
         d = [CHANGE_MODE, self.value, slowness]
         return d
 
+    def frame(self) -> CommandFrame:
+        slowness = speed2slowness(self.speed)
+        return cached_frame(
+            (CHANGE_MODE, self.value, slowness),
+            [CHANGE_MODE, self.value, slowness],
+            name=self.name,
+        )
+
 
 class CustomMode(Mode):
 
     RESPONSE_LEN = RESPONSE_LEN_CUSTOM_MODE
 
+    __slots__ = ("colors", "mode", "_color_list")
+
     def __repr__(self):
         return "<CustomMode: {} colors, speed={}, mode={}>".format(
             len(self.colors),
@@ -109,6 +133,18 @@ class CustomMode(Mode):
         )
         return data
 
+    def frame(self) -> CommandFrame:
+        return CommandFrame(self._make_data(), name=self.name)
+
+
+@lru_cache(maxsize=1024)
+def jump_frame(rgb) -> CommandFrame:
+    """A one-color JUMP CustomMode frame for `rgb`, built once per color.
+
+    Sent just before a color is set, it makes the bulb change without fading.
+    """
+    return CustomMode(mode=MODE_JUMP, speed=0.1, colors=[tuple(rgb)]).frame()
+
 
 _RAINBOW_CROSSFADE = 0x25
 _RED_GRADUALLY = 0x26
@@ -194,3 +230,16 @@ _VALUE_TO_MODE = {
     _CUSTOM: CUSTOM,
     _SETUP: SETUP_MODE,
 }
+
+_UNKNOWN_MODES = {}
+
+
+def get_mode(value):
+    """The Mode reported as `value` by a bulb.
+
+    Values without a built-in mode get one shared "UNKOWN" Mode each.
+    """
+    try:
+        return _VALUE_TO_MODE[value]
+    except KeyError:
+        return _UNKNOWN_MODES.setdefault(value, Mode(value, 1, "UNKOWN"))
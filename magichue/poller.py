@@ -0,0 +1,327 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from .light import AbstractLight
+from .magichue import Status
+from .modes import Mode
+
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _comparable(status: Status, name: str):
+    value = getattr(status, name)
+    # A CustomMode set here comes back from the bulb as modes.CUSTOM, so
+    # modes are compared by number.
+    if isinstance(value, Mode):
+        return value.number
+    return value
+
+
+def diff_status(old: Status, new: Status) -> Dict[str, tuple]:
+    """`{field: (old value, new value)}` for every field that differs."""
+    return {
+        name: (getattr(old, name), getattr(new, name))
+        for name in Status.__slots__
+        if _comparable(old, name) != _comparable(new, name)
+    }
+
+
+@dataclass
+class StatusChange:
+    """The status of `light` was found to differ from what it was before."""
+
+    light: AbstractLight
+    old: Status
+    new: Status
+    changes: Dict[str, tuple]
+
+
+@dataclass
+class _Schedule:
+    light: AbstractLight
+    interval: float
+    due: float = 0.0
+    failures: int = 0
+    polling: bool = False
+    removed: bool = False
+
+
+class StatusPoller:
+    """Polls `update_status()` of many lights and reports what changed.
+
+    Each light has its own interval. It drops to `min_interval` whenever the
+    light's status changes, and grows by `growth` after every poll that
+    finds nothing new, up to `max_interval`, so quiet bulbs cost little.
+    Unreachable lights are retried after exponentially longer delays, up to
+    `max_backoff`. Every delay is randomized by +/-`jitter` (a fraction) so
+    the queries spread out over time instead of arriving in bursts.
+
+    Changes are delivered to callbacks, on the poller's worker threads:
+
+    >>> poller = StatusPoller(lights)
+    >>> poller.add_callback(lambda change: print(change.light, change.changes))
+    >>> poller.start()
+
+    or through an async iterator:
+
+    >>> async for change in poller.changes():
+    ...     ...
+
+    A change is reported when the bulb differs from the light's status as
+    it was before the poll, so colors set by this process are not reported
+    unless something else changes them again.
+
+    A light is polled by one thread at a time: `poll()` skips a light whose
+    poll is already running. The application may keep using the lights
+    meanwhile; LocalLight runs one exchange with its bulb at a time, so a
+    poll waits for a command being sent and the other way round. A color
+    set while a poll is in flight can still be overwritten by the status
+    that poll reads.
+    """
+
+    def __init__(
+        self,
+        lights: Iterable[AbstractLight] = (),
+        min_interval: float = 1.0,
+        max_interval: float = 60.0,
+        growth: float = 1.5,
+        jitter: float = 0.2,
+        max_backoff: float = 300.0,
+        max_workers: int = 16,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.growth = growth
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.max_workers = max_workers
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._schedules: Dict[int, _Schedule] = {}
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._callbacks: List[Callable[[StatusChange], Any]] = []
+        self._thread = None
+        self._executor = None
+        self._stopping = False
+        for light in lights:
+            self.add(light)
+
+    def __repr__(self):
+        return "<StatusPoller: %d lights>" % len(self)
+
+    def __len__(self):
+        return len(self._schedules)
+
+    def __contains__(self, light):
+        return id(light) in self._schedules
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _jittered(self, delay: float) -> float:
+        if not self.jitter:
+            return delay
+        return delay * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _push(self, schedule: _Schedule, delay: float):
+        # Called with the lock held.
+        schedule.due = time.monotonic() + delay
+        heapq.heappush(self._heap, (schedule.due, next(self._counter), schedule))
+        self._wakeup.notify()
+
+    def add(self, light: AbstractLight):
+        """Start polling `light`, at a random time within `min_interval`."""
+        with self._lock:
+            if id(light) in self._schedules:
+                return
+            schedule = _Schedule(light, self.min_interval)
+            self._schedules[id(light)] = schedule
+            self._push(schedule, self._random.uniform(0, self.min_interval))
+
+    def remove(self, light: AbstractLight):
+        with self._lock:
+            schedule = self._schedules.pop(id(light), None)
+            if schedule is not None:
+                schedule.removed = True
+
+    def add_callback(self, callback: Callable[[StatusChange], Any]):
+        with self._lock:
+            self._callbacks = [*self._callbacks, callback]
+
+    def remove_callback(self, callback: Callable[[StatusChange], Any]):
+        with self._lock:
+            self._callbacks = [cb for cb in self._callbacks if cb is not callback]
+
+    def interval(self, light: AbstractLight) -> float:
+        """Current polling interval of `light`, without backoff or jitter."""
+        return self._schedules[id(light)].interval
+
+    def unreachable(self) -> List[AbstractLight]:
+        """Lights whose last poll failed."""
+        with self._lock:
+            return [s.light for s in self._schedules.values() if s.failures]
+
+    def poll(self, light: AbstractLight) -> Optional[StatusChange]:
+        """Poll `light` now and schedule its next poll.
+
+        Returns the change, if there is one, after calling the callbacks.
+        Returns None without polling if a poll of `light` is already running.
+        """
+        with self._lock:
+            schedule = self._schedules[id(light)]
+            if schedule.polling:
+                return None
+            schedule.polling = True
+        return self._poll(schedule)
+
+    def poll_due(self) -> List[StatusChange]:
+        """Poll every light that is due, one after another, in this thread.
+
+        For callers that drive polling from their own loop instead of
+        `start()`."""
+        changes = []
+        for schedule in self._pop_due():
+            change = self._poll(schedule)
+            if change is not None:
+                changes.append(change)
+        return changes
+
+    def _pop_due(self) -> List[_Schedule]:
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, _, schedule = heapq.heappop(self._heap)
+                if schedule.removed or schedule.polling or when != schedule.due:
+                    continue  # superseded by a later entry
+                schedule.polling = True
+                due.append(schedule)
+        return due
+
+    def _poll(self, schedule: _Schedule) -> Optional[StatusChange]:
+        light = schedule.light
+        loaded = getattr(light, "_status_loaded", True)
+        old = light.status.copy() if loaded else None
+        try:
+            light.update_status()
+        except Exception as e:
+            with self._lock:
+                schedule.failures += 1
+                schedule.polling = False
+                delay = min(
+                    schedule.interval * 2 ** schedule.failures, self.max_backoff
+                )
+                if not schedule.removed:
+                    self._push(schedule, self._jittered(delay))
+            _LOGGER.debug(
+                "Polling %s failed (%r), retrying in %.1fs", light._target(), e, delay
+            )
+            return None
+
+        new = light.status.copy()
+        changes = diff_status(old, new) if old is not None else {}
+        with self._lock:
+            schedule.failures = 0
+            schedule.polling = False
+            if changes:
+                schedule.interval = self.min_interval
+            else:
+                schedule.interval = min(
+                    schedule.interval * self.growth, self.max_interval
+                )
+            if not schedule.removed:
+                self._push(schedule, self._jittered(schedule.interval))
+            callbacks = self._callbacks
+        if not changes:
+            return None
+        change = StatusChange(light, old, new, changes)
+        _LOGGER.debug("%s changed: %s", light._target(), changes)
+        for callback in callbacks:
+            try:
+                callback(change)
+            except Exception:
+                _LOGGER.exception("Status change callback %r failed", callback)
+        return change
+
+    def start(self):
+        """Poll in the background, on up to `max_workers` threads."""
+        if self.running:
+            return
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="magichue-poller"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="magichue-poller", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and wait for the polls in progress to finish."""
+        if not self.running:
+            return
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._thread = self._executor = None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._stopping:
+                    if self._heap:
+                        timeout = self._heap[0][0] - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._wakeup.wait(timeout)
+                if self._stopping:
+                    return
+            for schedule in self._pop_due():
+                self._executor.submit(self._poll, schedule)
+
+    async def changes(self) -> AsyncIterator[StatusChange]:
+        """Change events, as they are found. Starts the poller if needed,
+        and stops it again when the iteration ends."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def put(change):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, change)
+            except RuntimeError:  # the event loop is closed
+                pass
+
+        self.add_callback(put)
+        started = not self.running
+        if started:
+            self.start()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.remove_callback(put)
+            if started:
+                await loop.run_in_executor(None, self.stop)
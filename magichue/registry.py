@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Union
+
+from .discover import DISCOVERY_PORT, iter_bulbs
+from .light import LocalLight
+from .magichue import Status
+
+
+_LOGGER = logging.getLogger(__name__)
+
+FILE_VERSION = 1
+
+
+@dataclass
+class RegistryEntry:
+
+    macaddr: str
+    ipaddr: str
+    model: str = ""
+    status: Optional[Status] = None
+    last_seen: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "macaddr": self.macaddr,
+            "ipaddr": self.ipaddr,
+            "model": self.model,
+            "status": self.status.dump().hex() if self.status else None,
+            "last_seen": self.last_seen,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RegistryEntry":
+        status = None
+        if data.get("status"):
+            status = Status()
+            status.parse(bytes.fromhex(data["status"]))
+        return cls(
+            macaddr=data["macaddr"],
+            ipaddr=data["ipaddr"],
+            model=data.get("model", ""),
+            status=status,
+            last_seen=data.get("last_seen", 0.0),
+        )
+
+
+class BulbRegistry:
+    """Bulbs on the local network, keyed by MAC address and kept in a file.
+
+    Known bulbs are served from the file right away; discovery runs in a
+    background thread once the results are older than `ttl` seconds. When a
+    bulb turns up at a new address, LocalLights handed out by `light()`
+    follow it.
+
+    >>> registry = BulbRegistry("~/.cache/magichue.json")
+    >>> lights = [registry.light(bulb.macaddr) for bulb in registry.bulbs()]
+    >>> registry.save()  # remember the lights' last status
+    """
+
+    light_class = LocalLight
+    discovery_port = DISCOVERY_PORT
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: float = 300.0,
+        timeout: float = 1.0,
+        broadcast_ip: Union[str, Iterable[str]] = "255.255.255.255",
+        source_ip: Optional[Union[str, Iterable[str]]] = None,
+    ):
+        self.path = os.path.expanduser(path) if path else None
+        self.ttl = ttl
+        self.timeout = timeout
+        self.broadcast_ip = broadcast_ip
+        self.source_ip = source_ip
+        self.refreshed = 0.0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, RegistryEntry] = {}
+        self._lights = weakref.WeakValueDictionary()
+        self._refresh_thread = None
+        if self.path is not None and os.path.exists(self.path):
+            self.load()
+
+    def __repr__(self):
+        return "<BulbRegistry: %d bulbs>" % len(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, macaddr):
+        return macaddr in self._entries
+
+    def __getitem__(self, macaddr) -> RegistryEntry:
+        return self._entries[macaddr]
+
+    def __iter__(self):
+        return iter(self.bulbs())
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.refreshed > self.ttl
+
+    def bulbs(self) -> List[RegistryEntry]:
+        """Known bulbs, without waiting. Starts a refresh if they are stale."""
+        if self.stale:
+            self.refresh(wait=False)
+        with self._lock:
+            return list(self._entries.values())
+
+    def refresh(self, wait: bool = True):
+        """Run discovery now, unless a refresh is already running."""
+        with self._lock:
+            thread = self._refresh_thread
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._refresh, daemon=True)
+                self._refresh_thread = thread
+                thread.start()
+        if wait:
+            thread.join()
+
+    def _refresh(self):
+        try:
+            for bulb in iter_bulbs(
+                timeout=self.timeout,
+                broadcast_ip=self.broadcast_ip,
+                source_ip=self.source_ip,
+                port=self.discovery_port,
+            ):
+                self._found(bulb.macaddr, bulb.ipaddr, bulb.model)
+        except OSError as e:
+            _LOGGER.warning("Discovery failed: %s", e)
+            return
+        except Exception:
+            # Runs in a background thread, where nobody would see it.
+            _LOGGER.exception("Discovery failed")
+            return
+        self.refreshed = time.time()
+        if self.path is not None:
+            try:
+                self.save()
+            except Exception:
+                _LOGGER.exception("Saving %s failed", self.path)
+
+    def _found(self, macaddr: str, ipaddr: str, model: str):
+        with self._lock:
+            entry = self._entries.get(macaddr)
+            if entry is None:
+                entry = RegistryEntry(macaddr, ipaddr, model)
+                self._entries[macaddr] = entry
+            moved = entry.ipaddr != ipaddr
+            entry.ipaddr = ipaddr
+            entry.model = model or entry.model
+            entry.last_seen = time.time()
+            light = self._lights.get(macaddr)
+        if moved:
+            _LOGGER.debug("Bulb %s moved to %s", macaddr, ipaddr)
+            if light is not None and light.ipaddr != ipaddr:
+                light.ipaddr = ipaddr
+                light.close()
+
+    def light(self, macaddr: str, **kwargs) -> LocalLight:
+        """A lazy LocalLight for `macaddr`, started from its last known status.
+
+        The cached status is only a hint: the light neither connects nor
+        queries the bulb when created, and fetches its real status when it
+        is first read. The same object is returned for as long as it is
+        referenced.
+        """
+        with self._lock:
+            light = self._lights.get(macaddr)
+            if light is not None:
+                return light
+            entry = self._entries[macaddr]
+            ipaddr = entry.ipaddr
+            hint = entry.status.copy() if entry.status else None
+        kwargs.setdefault("lazy", True)
+        if hint is not None:
+            kwargs.setdefault("bulb_type", hint.bulb_type)
+        light = self.light_class(ipaddr, **kwargs)
+        if hint is not None and not light._status_loaded:
+            light.status = hint
+        with self._lock:
+            return self._lights.setdefault(macaddr, light)
+
+    def load(self):
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("version") != FILE_VERSION:
+            _LOGGER.warning("Ignoring %s: unknown version", self.path)
+            return
+        with self._lock:
+            for item in data["bulbs"]:
+                entry = RegistryEntry.from_dict(item)
+                self._entries[entry.macaddr] = entry
+            self.refreshed = data.get("refreshed", 0.0)
+
+    def save(self):
+        """Write known bulbs, with the status of live lights, to `path`."""
+        if self.path is None:
+            raise ValueError("This registry has no path to save to")
+        with self._lock:
+            for macaddr, light in list(self._lights.items()):
+                if light._status_loaded:
+                    self._entries[macaddr].status = light.status.copy()
+            data = {
+                "version": FILE_VERSION,
+                "refreshed": self.refreshed,
+                "bulbs": [entry.to_dict() for entry in self._entries.values()],
+            }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
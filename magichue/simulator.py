@@ -0,0 +1,344 @@
+"""Simulated bulbs, for load tests and benchmarks without hardware.
+
+Each SimulatedBulb speaks the local protocol over TCP: it answers queries,
+applies color, mode, custom mode and power frames to its status, and
+answers UDP discovery. On Linux every 127.x.y.z address is local, so a
+Simulator gives each bulb its own loopback address on the usual port and
+LocalLight needs no changes:
+
+>>> async with Simulator([SimulatedBulb() for _ in range(1000)]) as sim:
+...     ...
+
+or, for blocking code, ``with sim.running(): ...``. From the shell:
+
+    $ python -m magichue.simulator --bulbs 1000 --latency 0.02 --loss 0.01
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from . import bulb_types
+from . import commands
+from . import modes
+from . import utils
+from .discover import DISCOVERY_MSG, DISCOVERY_PORT
+from .framing import valid_checksum
+from .magichue import Status
+
+
+_LOGGER = logging.getLogger(__name__)
+
+PORT = 5577
+MODEL = "HF-LPB100-ZJ200"
+
+# Length of each incoming frame, keyed by its first byte. SET_COLOR depends
+# on the bulb type.
+_FRAME_LEN = {
+    commands.QUERY_STATUS_1: 4,
+    commands.QueryCurrentTime.array[0]: 5,
+    commands.QueryTimers.array[0]: 5,
+    commands.QueryCustomMode.array[0]: 5,
+    commands.TURN_ON_1: 4,
+    commands.CHANGE_MODE: 5,
+    commands.CUSTOM_MODE: 71,
+}
+
+
+def _response(data) -> bytes:
+    data = bytes(data)
+    return data + bytes([sum(data) & 0xFF])
+
+
+class SimulatedBulb:
+    """State and protocol of one simulated bulb.
+
+    latency: seconds before each response is sent
+    jitter: up to this many seconds added to or taken from the latency
+    loss: probability that an incoming frame is silently dropped
+    """
+
+    def __init__(
+        self,
+        bulb_type: int = bulb_types.BULB_RGBWW,
+        macaddr: Optional[str] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self._random = random.Random(seed)
+        self.macaddr = macaddr or "ACCF23%06X" % self._random.getrandbits(24)
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.status = Status()
+        self.status.bulb_type = bulb_type
+        self.clock_offset = timedelta()
+        self.timers = bytes(91)
+        self.custom_mode = bytes(67)
+        self.frames_received = 0
+        self.frames_dropped = 0
+
+    def __repr__(self):
+        return "<SimulatedBulb: %s %s>" % (
+            self.macaddr,
+            bulb_types.str_bulb_type(self.status.bulb_type),
+        )
+
+    def delay(self) -> float:
+        jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0
+        return max(0.0, self.latency + jitter)
+
+    def frame_lens(self, buf) -> Tuple[int, ...]:
+        """Possible lengths of the frame at the start of `buf`, to try in order."""
+        if buf[0] != commands.SET_COLOR:
+            length = _FRAME_LEN.get(buf[0])
+            return () if length is None else (length,)
+        length = 9 if self.status.bulb_type == bulb_types.BULB_RGBWWCW else 8
+        # LocalLight sends color frames with the 0x0F terminator twice.
+        if len(buf) >= length and buf[length - 1] == 0x0F:
+            return (length + 1, length)
+        return (length,)
+
+    def handle(self, frame: bytes) -> Optional[bytes]:
+        """Apply one incoming frame. Returns the response, if there is one."""
+        if self.loss and self._random.random() < self.loss:
+            self.frames_dropped += 1
+            return None
+        self.frames_received += 1
+        status = self.status
+        first = frame[0]
+        if first == commands.QUERY_STATUS_1:
+            return status.dump()
+        if first == commands.QueryCurrentTime.array[0]:
+            now = datetime.now() + self.clock_offset
+            return _response(
+                [0x0F, 0x11, 0x14, now.year - 2000, now.month, now.day]
+                + [now.hour, now.minute, now.second, now.isoweekday(), 0x00]
+            )
+        if first == commands.QueryTimers.array[0]:
+            return _response(b"\x0f\x22" + self.timers)
+        if first == commands.QueryCustomMode.array[0]:
+            return _response(b"\x0f\x52" + self.custom_mode)
+        if first == commands.TURN_ON_1:
+            status.on = frame[1] == commands.ON
+            return _response([0x0F, 0x71, frame[1]])
+        if first == commands.SET_COLOR:
+            status.r, status.g, status.b, status.w = frame[1:5]
+            if status.bulb_type == bulb_types.BULB_RGBWWCW:
+                status.cw = frame[5]
+                status.is_white = frame[6] == commands.TRUE
+            else:
+                status.is_white = frame[5] == commands.TRUE
+            status.mode = modes.NORMAL
+        elif first == commands.CHANGE_MODE:
+            status.mode = modes.get_mode(frame[1])
+            status.speed = utils.slowness2speed(frame[2])
+        elif first == commands.CUSTOM_MODE:
+            status.mode = modes.CUSTOM
+            status.speed = utils.slowness2speed(frame[65])
+            self.custom_mode = bytes(frame[1:68])
+        return None
+
+
+class _BulbServerProtocol(asyncio.Protocol):
+    def __init__(self, bulb: SimulatedBulb):
+        self.bulb = bulb
+        self.transport = None
+        self._buf = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+
+    def data_received(self, data):
+        buf = self._buf
+        buf.extend(data)
+        while buf:
+            for length in self.bulb.frame_lens(buf):
+                if len(buf) < length:
+                    return
+                if valid_checksum(buf[:length]):
+                    break
+            else:
+                del buf[0]  # not a valid frame; resync on the next byte
+                continue
+            frame = bytes(buf[:length])
+            del buf[:length]
+            response = self.bulb.handle(frame)
+            if response is not None:
+                self._respond(response)
+
+    def _respond(self, response: bytes):
+        delay = self.bulb.delay()
+        if delay:
+            asyncio.get_running_loop().call_later(delay, self._write, response)
+        else:
+            self._write(response)
+
+    def _write(self, data: bytes):
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.write(data)
+
+
+class _DiscoveryServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, simulator: "Simulator"):
+        self.simulator = simulator
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if data != DISCOVERY_MSG:
+            return
+        for (host, _), bulb in zip(self.simulator.addresses, self.simulator.bulbs):
+            if bulb.loss and bulb._random.random() < bulb.loss:
+                continue
+            reply = ("%s,%s,%s" % (host, bulb.macaddr, MODEL)).encode()
+            self.transport.sendto(reply, addr)
+
+
+class Simulator:
+    """Serves SimulatedBulbs over TCP, plus UDP discovery for all of them.
+
+    With a fixed `port`, bulb number i listens on the i-th address counting
+    from `host`. With port 0, every bulb listens on `host`, each on its own
+    free port. Set `discovery_port` to None to skip discovery.
+    """
+
+    def __init__(
+        self,
+        bulbs: Sequence[SimulatedBulb],
+        host: str = "127.0.0.1",
+        port: int = PORT,
+        discovery_host: str = "0.0.0.0",
+        discovery_port: Optional[int] = DISCOVERY_PORT,
+    ):
+        self.bulbs = list(bulbs)
+        self.host = host
+        self.port = port
+        self.discovery_host = discovery_host
+        self.discovery_port = discovery_port
+        self.addresses: List[Tuple[str, int]] = []
+        self._servers = []
+        self._discovery = None
+
+    def __repr__(self):
+        return "<Simulator: %d bulbs>" % len(self.bulbs)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        first = ipaddress.ip_address(self.host)
+        for i, bulb in enumerate(self.bulbs):
+            host = str(first + i) if self.port else self.host
+            server = await loop.create_server(
+                lambda bulb=bulb: _BulbServerProtocol(bulb),
+                host,
+                self.port,
+                reuse_address=True,
+            )
+            self._servers.append(server)
+            self.addresses.append(server.sockets[0].getsockname()[:2])
+        if self.discovery_port is not None:
+            self._discovery, _ = await loop.create_datagram_endpoint(
+                lambda: _DiscoveryServerProtocol(self),
+                local_addr=(self.discovery_host, self.discovery_port),
+                allow_broadcast=True,
+            )
+            self.discovery_port = self._discovery.get_extra_info("sockname")[1]
+        _LOGGER.debug("Simulating %d bulbs", len(self.bulbs))
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        self.addresses = []
+        if self._discovery is not None:
+            self._discovery.close()
+            self._discovery = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    @contextmanager
+    def running(self):
+        """Run the simulator on an event loop in a background thread."""
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self.start(), loop).result()
+            yield self
+        finally:
+            asyncio.run_coroutine_threadsafe(self.stop(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+
+_BULB_TYPES = {
+    "rgbww": bulb_types.BULB_RGBWW,
+    "tape": bulb_types.BULB_TAPE,
+    "rgbwwcw": bulb_types.BULB_RGBWWCW,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m magichue.simulator", description="Simulate local bulbs."
+    )
+    parser.add_argument("--bulbs", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--discovery-port", type=int, default=DISCOVERY_PORT)
+    parser.add_argument("--type", choices=sorted(_BULB_TYPES), default="rgbww")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    bulbs = [
+        SimulatedBulb(
+            _BULB_TYPES[args.type],
+            latency=args.latency,
+            jitter=args.jitter,
+            loss=args.loss,
+            seed=None if args.seed is None else args.seed + i,
+        )
+        for i in range(args.bulbs)
+    ]
+    simulator = Simulator(
+        bulbs, args.host, args.port, discovery_port=args.discovery_port
+    )
+
+    async def serve():
+        async with simulator:
+            for (host, port), bulb in zip(simulator.addresses, bulbs):
+                print("%s:%d %s" % (host, port, bulb.macaddr))
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class StreamStats:
+    """Counters of a color stream.
+
+    sent: frames written to the bulb
+    dropped: colors replaced by a newer one before they could be sent
+    late: frames that waited more than one frame interval past their slot
+    """
+
+    sent: int = 0
+    dropped: int = 0
+    late: int = 0
+
+
+class _Mailbox:
+    """Holds the next color to send.
+
+    The producer takes a new color from the source only when there is room:
+    once the waiting color has been sent, or, while the bulb is backed up,
+    to replace it with a newer one (latest value wins).
+    """
+
+    def __init__(self, stats: StreamStats, on_room=None):
+        self._cond = threading.Condition()
+        self._stats = stats
+        self._on_room = on_room
+        self._value = None
+        self._queued = 0.0
+        self._pending = False
+        self._replace = False
+        self.closed = False
+        self.stopped = False
+
+    @property
+    def pending(self) -> bool:
+        return self._pending
+
+    def _notify(self):
+        self._cond.notify_all()
+        if self._on_room is not None:
+            self._on_room()
+
+    def _has_room(self) -> bool:
+        return self.stopped or not self._pending or self._replace
+
+    def _use_room(self) -> bool:
+        if self.stopped:
+            return False
+        self._replace = False
+        return True
+
+    def claim(self):
+        """True if the producer may take the next color, False once the
+        stream is stopped, None if it has to wait."""
+        with self._cond:
+            if not self._has_room():
+                return None
+            return self._use_room()
+
+    def wait(self) -> bool:
+        """Block until the producer may take the next color."""
+        with self._cond:
+            self._cond.wait_for(self._has_room)
+            return self._use_room()
+
+    def put(self, value):
+        with self._cond:
+            if self._pending:
+                self._stats.dropped += 1
+            self._value = value
+            self._queued = time.monotonic()
+            self._pending = True
+
+    def take(self):
+        with self._cond:
+            pending, self._pending = self._pending, False
+            if pending:
+                self._notify()
+            return pending, self._value, self._queued
+
+    def backed_up(self):
+        """Let the producer replace the waiting color with a newer one."""
+        with self._cond:
+            if self._pending and not self._replace:
+                self._replace = True
+                self._notify()
+
+    def stop(self):
+        with self._cond:
+            self.stopped = True
+            self._notify()
+
+
+class _Pacer:
+    """Frame clock for `max_fps`, counting frames that miss their slot."""
+
+    def __init__(self, max_fps: float, stats: StreamStats):
+        if max_fps <= 0:
+            raise ValueError("max_fps must be a positive number")
+        self.interval = 1.0 / max_fps
+        self._stats = stats
+        self._next = time.monotonic()
+
+    def delay(self) -> float:
+        return max(0.0, self._next - time.monotonic())
+
+    def sent(self, queued: float):
+        # Count from when the color was queued: until then the slot was
+        # waiting on the source, not on us.
+        now = time.monotonic()
+        if now - max(self._next, queued) > self.interval:
+            self._stats.late += 1
+        self._next = max(self._next + self.interval, now)
+
+
+def _send_latest(
+    light, mailbox: _Mailbox, pacer: _Pacer, stats: StreamStats, last: bool = False
+):
+    # Leave the color in the mailbox while the socket is backed up, so it
+    # can still be replaced by a newer one. Nothing will replace the last
+    # color, so it gets up to the light's timeout, then is dropped rather
+    # than kept forever by a stalled bulb.
+    if not light._is_writable(light.timeout if last else 0.0):
+        if not last:
+            mailbox.backed_up()
+            return
+        if mailbox.take()[0]:
+            stats.dropped += 1
+        return
+    pending, color, queued = mailbox.take()
+    if pending:
+        light.rgb = color
+        stats.sent += 1
+        pacer.sent(queued)
+
+
+def stream_colors(light, colors, max_fps: float = 30.0) -> StreamStats:
+    """Send colors from an iterator at most `max_fps` times a second."""
+    stats = StreamStats()
+    mailbox = _Mailbox(stats)
+    pacer = _Pacer(max_fps, stats)
+    errors = []
+
+    def produce():
+        try:
+            it = iter(colors)
+            while mailbox.wait():
+                try:
+                    color = next(it)
+                except StopIteration:
+                    break
+                mailbox.put(color)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            mailbox.closed = True
+
+    producer = threading.Thread(target=produce, name="magichue-stream", daemon=True)
+    producer.start()
+    try:
+        while True:
+            time.sleep(pacer.delay() or pacer.interval / 10)
+            closed = mailbox.closed
+            _send_latest(light, mailbox, pacer, stats, closed)
+            if closed and not mailbox.pending:
+                break
+    finally:
+        mailbox.stop()
+        producer.join()
+    if errors:
+        raise errors[0]
+    return stats
+
+
+async def astream_colors(light, colors, max_fps: float = 30.0) -> StreamStats:
+    """Send colors from an async iterator at most `max_fps` times a second."""
+    loop = asyncio.get_running_loop()
+    room = asyncio.Event()
+    stats = StreamStats()
+    mailbox = _Mailbox(stats, on_room=lambda: loop.call_soon_threadsafe(room.set))
+    pacer = _Pacer(max_fps, stats)
+
+    async def produce():
+        try:
+            it = colors.__aiter__()
+            while True:
+                room.clear()
+                claimed = mailbox.claim()
+                if claimed is None:
+                    await room.wait()
+                    continue
+                if not claimed:
+                    break
+                try:
+                    color = await it.__anext__()
+                except StopAsyncIteration:
+                    break
+                mailbox.put(color)
+        finally:
+            mailbox.closed = True
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            await asyncio.sleep(pacer.delay() or pacer.interval / 10)
+            if producer.done() and producer.exception() is not None:
+                break
+            closed = mailbox.closed
+            # Sending blocks (connects, retries with sleeps), so keep it off
+            # the event loop.
+            await loop.run_in_executor(
+                None, _send_latest, light, mailbox, pacer, stats, closed
+            )
+            if closed and not mailbox.pending:
+                break
+    finally:
+        mailbox.stop()
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+    await producer
+    return stats
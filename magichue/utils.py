@@ -1,3 +1,6 @@
+import select
+
+
 __all__ = [
     "speed2slowness",
     "slowness2speed",
@@ -25,3 +28,18 @@ def round_value(value, _min, _max):
     if value > _max:
         return _max
     return value
+
+
+def ready(sock, write=False, timeout=0.0):
+    """True if `sock` becomes readable (or writable) within `timeout` seconds.
+
+    Uses poll() where available, since select() fails on file descriptors
+    above FD_SETSIZE (1024), which a large fleet of lights easily reaches.
+    """
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        poller.register(sock, select.POLLOUT if write else select.POLLIN)
+        return bool(poller.poll(timeout * 1000))
+    if write:
+        return bool(select.select([], [sock], [], timeout)[1])
+    return bool(select.select([sock], [], [], timeout)[0])
@@ -0,0 +1,67 @@
+'''
+Micro-benchmark: frames per second for each command.
+
+"rebuilt" is the old per-send path (terminator, checksum via hex()
+slicing, struct.pack with a runtime format string, zfill hex string);
+"cached" is the prebuilt frame lookup.
+
+    $ python tests/bench_frames.py
+'''
+
+import pathlib
+import struct
+import sys
+import timeit
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from magichue import commands, modes
+
+
+def rebuild(arr, needs_terminator=True, is_remote=False):
+    if needs_terminator:
+        arr = arr + [0xF0 if is_remote else 0x0F]
+    arr = arr + [int(hex(sum(arr))[-2:], 16)]
+    local = struct.pack("!%dB" % len(arr), *arr)
+    remote = "".join([hex(v)[2:].zfill(2) for v in arr])
+    return local, remote
+
+
+def cases():
+    for cmd in (
+        commands.TurnON,
+        commands.TurnOFF,
+        commands.QueryStatus,
+        commands.QueryCurrentTime,
+    ):
+        yield (
+            cmd.__name__,
+            lambda cmd=cmd: rebuild(cmd.array, cmd.needs_terminator),
+            lambda cmd=cmd: (cmd.byte_string(), cmd.hex_string(is_remote=True)),
+        )
+    for name in modes.__all__:
+        mode = getattr(modes, name)
+        if type(mode) is not modes.Mode:
+            continue
+        yield (
+            name,
+            lambda mode=mode: rebuild(mode._make_data()),
+            lambda mode=mode: (
+                mode.frame().byte_string(),
+                mode.frame().hex_string(is_remote=True),
+            ),
+        )
+
+
+def fps(func, number=20000):
+    return number / timeit.timeit(func, number=number)
+
+
+def main():
+    print("%-22s %14s %14s" % ("command", "rebuilt fps", "cached fps"))
+    for name, rebuilt, cached in cases():
+        print("%-22s %14.0f %14.0f" % (name, fps(rebuilt), fps(cached)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+'''
+Benchmark: per-query latency of LocalLight.update_status().
+
+Compares the old flush, which waited `timeout` seconds in select() before
+every query, with the non-blocking drain plus framed read.
+
+    $ python tests/bench_query_latency.py
+'''
+
+import pathlib
+import select
+import sys
+import time
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from magichue import LocalLight
+from magichue.exceptions import DeviceDisconnected
+from fakebulb import FakeBulb
+
+
+class BlockingFlushLight(LocalLight):
+    """LocalLight with the previous receive-buffer flush."""
+
+    def _flush_receive_buffer(self):
+        while True:
+            read_sock, _, _ = select.select([self._sock], [], [], self.timeout)
+            if not read_sock:
+                break
+            if not self._receive(255):
+                raise DeviceDisconnected
+
+
+def measure(light_class, port, host, rounds):
+    light_class.port = port
+    light = light_class(host)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        light.update_status()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    with FakeBulb() as bulb:
+
+        class FramedLight(LocalLight):
+            pass
+
+        before = measure(BlockingFlushLight, bulb.port, bulb.host, 3)
+        after = measure(FramedLight, bulb.port, bulb.host, 1000)
+    print("before: %8.3f ms/query" % (before * 1000))
+    print("after:  %8.3f ms/query" % (after * 1000))
+
+
+if __name__ == "__main__":
+    main()
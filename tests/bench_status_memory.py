@@ -0,0 +1,66 @@
+'''
+Memory benchmark: bytes held per parsed Status.
+
+"dict" is a Status-like object with a per-instance __dict__ and a new
+Mode for every unknown mode value, as before; "slots" is the current
+Status.
+
+    $ python tests/bench_status_memory.py [count]
+'''
+
+import pathlib
+import sys
+import tracemalloc
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from magichue import modes
+from magichue.magichue import Status
+
+
+RESPONSE = bytearray(
+    [0x81, 0x44, 0x23, 0x99, 0x00, 0x01, 0x0A, 0x14, 0x1E, 0x00, 0x07, 0x00, 0xF0]
+)
+RESPONSE.append(sum(RESPONSE) & 0xFF)
+
+
+class DictMode:
+    def __init__(self, value, speed, name):
+        self.value = value
+        self.speed = speed
+        self.name = name
+
+
+class DictStatus:
+    def __init__(self, data):
+        self.bulb_type = data[1]
+        self.on = data[2] == 0x23
+        self.mode = modes._VALUE_TO_MODE.get(data[3], DictMode(data[3], 1, "UNKOWN"))
+        self.speed = (31 - data[5]) / 30
+        self.r, self.g, self.b, self.w = data[6:10]
+        self.version = data[10]
+        self.cw = data[11]
+        self.is_white = data[12] == 0x0F
+
+
+def measure(make, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [make() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    data = bytes(RESPONSE)
+    view = memoryview(RESPONSE)
+    print("%-8s %16s" % ("status", "bytes/status"))
+    print("%-8s %16.1f" % ("dict", measure(lambda: DictStatus(data), count)))
+    print("%-8s %16.1f" % ("slots", measure(lambda: Status.from_bytes(view), count)))
+
+
+if __name__ == "__main__":
+    main()
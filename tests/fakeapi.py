@@ -0,0 +1,76 @@
+'''
+A local HTTP stand-in for the MagicHue cloud API, used by the tests.
+'''
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fakebulb import STATUS_RESPONSE
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.api.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        api = self.server.api
+        api.requests.append((self.path, payload))
+        if self.path.endswith("/login/MagicHue"):
+            return self._reply({"code": 0, "token": "TOKEN"})
+        if self.path.endswith("/sendRequestCommand/MagicHue"):
+            return self._reply({"code": 0, "data": STATUS_RESPONSE.hex()})
+        return self._reply({"code": 0})
+
+    def do_GET(self):
+        api = self.server.api
+        api.requests.append((self.path, None))
+        devices = [
+            {
+                "deviceType": 0x44,
+                "ledVersionNum": 7,
+                "macAddress": "MAC%04d" % i,
+                "localIP": "10.0.0.%d" % i,
+                "state": STATUS_RESPONSE.hex(),
+                "isOnline": True,
+            }
+            for i in range(api.devices)
+        ]
+        return self._reply({"code": 0, "data": devices})
+
+
+class FakeAPI:
+    def __init__(self, devices=0):
+        self.requests = []
+        self.connections = 0
+        self.devices = devices
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.api = self
+        host, port = self._server.server_address
+        self.base = "http://%s:%d/app" % (host, port)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
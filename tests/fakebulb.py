@@ -0,0 +1,164 @@
+'''
+A tiny TCP stand-in for a local bulb, used by the tests.
+'''
+
+import socket
+import socketserver
+import threading
+
+from magichue import LocalLight
+from magichue.discover import DISCOVERY_MSG
+
+
+STATUS_RESPONSE = bytes(
+    [0x81, 0x44, 0x23, 0x61, 0x00, 0x01, 0x0A, 0x14, 0x1E, 0x00, 0x07, 0x00, 0xF0]
+)
+STATUS_RESPONSE += bytes([sum(STATUS_RESPONSE) & 0xFF])
+
+TIME_RESPONSE = bytes([0x0F, 0x11, 0x14, 0x15, 0x0C, 0x15, 0x11, 0x26, 0x07, 0x02, 0x00])
+TIME_RESPONSE += bytes([sum(TIME_RESPONSE) & 0xFF])
+
+TIMERS_RESPONSE = bytes([0x0F, 0x22]) + bytes(91)
+TIMERS_RESPONSE += bytes([sum(TIMERS_RESPONSE) & 0xFF])
+
+CUSTOM_MODE_RESPONSE = bytes([0x0F, 0x52]) + bytes(67)
+CUSTOM_MODE_RESPONSE += bytes([sum(CUSTOM_MODE_RESPONSE) & 0xFF])
+
+# Length of each incoming local frame, keyed by its first byte.
+FRAME_LEN = {
+    0x81: 4,
+    0x11: 5,
+    0x22: 5,
+    0x52: 5,
+    0x71: 4,
+    0x61: 5,
+    0x51: 71,
+}
+
+
+def light_class(port, base=LocalLight):
+    """A subclass of `base` that connects to `port` and retries quickly."""
+
+    class _Light(base):
+        pass
+
+    _Light.port = port
+    _Light.backoff = 0.01
+    return _Light
+
+
+def make_light(bulb, **kwargs):
+    """A LocalLight for `bulb`, a FakeBulb or a (host, port) address."""
+    host, port = bulb if isinstance(bulb, tuple) else (bulb.host, bulb.port)
+    return light_class(port)(host, **kwargs)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        bulb = self.server.bulb
+        bulb.connections.append(self.request)
+        buf = b""
+        while True:
+            try:
+                chunk = self.request.recv(1024)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buf += chunk
+            while buf:
+                if buf[0] == 0x31:
+                    length = 9 if len(buf) > 7 and buf[7] == 0x0F else 8
+                else:
+                    length = FRAME_LEN.get(buf[0], len(buf))
+                if len(buf) < length:
+                    break
+                frame, buf = buf[:length], buf[length:]
+                bulb.received.append(frame)
+                response = bulb.respond(frame)
+                if response:
+                    self.request.sendall(response)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeBulb:
+    def __init__(self, host="127.0.0.1", ack_power=True, port=0):
+        self.received = []
+        self.connections = []
+        self.ack_power = ack_power
+        self.status_response = STATUS_RESPONSE
+        self._server = _Server((host, port), _Handler)
+        self._server.bulb = self
+        self.host, self.port = self._server.server_address
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def respond(self, frame):
+        if frame[0] == 0x81:
+            return self.status_response
+        if frame[0] == 0x11:
+            return TIME_RESPONSE
+        if frame[0] == 0x22:
+            return TIMERS_RESPONSE
+        if frame[0] == 0x52:
+            return CUSTOM_MODE_RESPONSE
+        if frame[0] == 0x71 and self.ack_power:
+            ack = bytes([0x0F, 0x71, frame[1]])
+            return ack + bytes([sum(ack) & 0xFF])
+        return None
+
+    def drop_connections(self):
+        for conn in self.connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+        self.connections = []
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeResponder:
+    """Answers each discovery message on 127.0.0.1 with `replies`."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.received = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.05)
+        self.port = self.sock.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, addr = self.sock.recvfrom(64)
+            except socket.timeout:
+                continue
+            if data == DISCOVERY_MSG:
+                self.received += 1
+                for reply in self.replies:
+                    self.sock.sendto(reply, addr)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._running = False
+        self._thread.join()
+        self.sock.close()
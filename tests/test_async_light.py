@@ -0,0 +1,80 @@
+'''
+Test: magichue/async_light.py
+'''
+
+import asyncio
+
+from magichue import AsyncLocalLight, RAINBOW_CROSSFADE
+from fakebulb import FakeBulb, light_class
+
+
+def make_light_class(bulb):
+    return light_class(bulb.port, AsyncLocalLight)
+
+
+def test_connect_and_status():
+    async def run(bulb):
+        light = await make_light_class(bulb).connect(bulb.host)
+        rgb = light.rgb
+        await light.close()
+        return rgb
+
+    with FakeBulb() as bulb:
+        assert asyncio.run(run(bulb)) == (0x0A, 0x14, 0x1E)
+
+
+def test_commands_are_sent():
+    async def run(bulb):
+        async with make_light_class(bulb)(bulb.host) as light:
+            await light.turn_off()
+            await light.set_rgb((1, 2, 3))
+            await light.set_mode(RAINBOW_CROSSFADE)
+            await light.update_status()
+
+    with FakeBulb() as bulb:
+        asyncio.run(run(bulb))
+        heads = [frame[0] for frame in bulb.received]
+    assert heads == [0x81, 0x71, 0x31, 0x61, 0x81]
+
+
+def test_no_fading_sends_one_write():
+    async def run(bulb):
+        async with make_light_class(bulb)(bulb.host, allow_fading=False) as light:
+            writes = []
+            write = light._protocol.write
+
+            def record(data):
+                writes.append(data)
+                write(data)
+
+            light._protocol.write = record
+            await light.set_rgb((1, 2, 3))
+            await light.update_status()
+        return writes
+
+    with FakeBulb() as bulb:
+        writes = asyncio.run(run(bulb))
+        heads = [frame[0] for frame in bulb.received]
+    assert heads == [0x81, 0x51, 0x31, 0x81]
+    assert writes[0][0] == 0x51 and len(writes) == 2
+
+
+def test_many_bulbs_on_one_loop():
+    async def run(bulbs):
+        lights = await asyncio.gather(
+            *[make_light_class(b).connect(b.host) for b in bulbs]
+        )
+        await asyncio.gather(*[light.update_status() for light in lights])
+        for light in lights:
+            await light.close()
+        return lights
+
+    bulbs = [FakeBulb() for _ in range(5)]
+    for bulb in bulbs:
+        bulb.__enter__()
+    try:
+        lights = asyncio.run(run(bulbs))
+    finally:
+        for bulb in bulbs:
+            bulb.__exit__()
+    assert all(light.on for light in lights)
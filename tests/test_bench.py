@@ -0,0 +1,30 @@
+'''
+Test: magichue/bench.py
+'''
+
+import json
+
+from magichue import bench
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert bench.percentile(values, 50) == 50
+    assert bench.percentile(values, 99) == 99
+    assert bench.percentile([3.0], 95) == 3.0
+
+
+def test_run_small_fleet():
+    report = bench.run(
+        clients=("local", "remote", "legacy"),
+        ops=("turn_on", "rgb", "mode", "discovery"),
+        sizes=(2,),
+        rounds=2,
+    )
+    json.dumps(report)
+    results = {(r["client"], r["op"]): r for r in report["results"]}
+    assert results[("local", "discovery")]["commands"] == 2
+    for client in ("local", "remote", "legacy"):
+        row = results[(client, "rgb")]
+        assert row["commands"] == 4
+        assert row["p50_ms"] <= row["p99_ms"]
@@ -0,0 +1,64 @@
+'''
+Test: magichue/color.py
+'''
+
+import colorsys
+
+import pytest
+
+from magichue import color
+
+
+COLORS = [(0, 0, 0), (255, 255, 255), (255, 0, 0), (12, 200, 99), (7, 8, 250)]
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "pure"])
+def backend(request, monkeypatch):
+    if request.param and not color.HAS_NUMPY:
+        pytest.skip("numpy is not installed")
+    monkeypatch.setattr(color, "HAS_NUMPY", request.param)
+
+
+def test_hsv_round_trip(backend):
+    hsv = color.rgb_to_hsv(COLORS)
+    assert hsv[3] == pytest.approx(colorsys.rgb_to_hsv(12 / 255, 200 / 255, 99 / 255))
+    assert color.hsv_to_rgb(hsv) == COLORS
+
+
+def test_hsl_round_trip(backend):
+    assert color.hsl_to_rgb(color.rgb_to_hsl(COLORS)) == COLORS
+
+
+def test_numpy_arrays():
+    np = pytest.importorskip("numpy")
+    arr = np.array(COLORS)
+    assert color.hsv_to_rgb(color.rgb_to_hsv(arr)).tolist() == [list(c) for c in COLORS]
+    assert color.hsl_to_rgb(color.rgb_to_hsl(arr)).tolist() == [list(c) for c in COLORS]
+
+
+def test_gradient(backend):
+    assert color.gradient((0, 0, 0), (255, 255, 255), 3) == [
+        (0, 0, 0),
+        (128, 128, 128),
+        (255, 255, 255),
+    ]
+    assert color.gradient((255, 0, 0), (0, 0, 255), 3, space="hsv") == [
+        (255, 0, 0),
+        (255, 0, 255),
+        (0, 0, 255),
+    ]
+
+
+def test_rainbow_and_palette(backend):
+    assert color.rainbow(3) == [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+    assert color.palette([(255, 0, 0), (0, 255, 0), (0, 0, 255)], 5)[::2] == [
+        (255, 0, 0),
+        (0, 255, 0),
+        (0, 0, 255),
+    ]
+
+
+def test_kelvin_to_rgb():
+    warm, daylight = color.kelvin_to_rgb([2700, 6500])
+    assert warm[0] == 255 and warm[2] < warm[1] < 255
+    assert min(daylight) > 240
@@ -37,3 +37,53 @@ def test_from_array():
     cmd = commands.Command.from_array(arr)
     assert cmd.hex_string() == "31a1f0120fe3"
     assert cmd.hex_array() == arr + [0x0f, 0xe3]
+
+
+def test_from_array_does_not_touch_command():
+    commands.Command.from_array([0x31, 0x01])
+    assert not hasattr(commands.Command, "array")
+
+
+def test_command_frame_is_immutable():
+    frame = commands.CommandFrame([0x31, 0xa1, 0xf0, 0x12])
+    with pytest.raises(AttributeError):
+        frame.array = [0x0]
+    assert frame.byte_string() == b'\x31\xa1\xf0\x12\x0f\xe3'
+    assert frame.hex_string(is_remote=True) == "31a1f012f0c4"
+
+
+def test_command_frame_concurrent_build():
+    from concurrent.futures import ThreadPoolExecutor
+
+    def build(i):
+        return commands.Command.from_array([0x31, i, i, i]).hex_array()[1:4]
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(build, range(256)))
+    assert results == [[i, i, i] for i in range(256)]
+
+
+def test_static_frames_are_cached():
+    assert commands.QueryStatus.frame() is commands.QueryStatus.frame()
+    assert commands.QueryStatus.byte_string() == b'\x81\x8a\x8b\x96'
+
+
+def test_calc_checksum_small_sum():
+    assert commands.Command.calc_checksum([0x1, 0x2]) == 0x3
+
+
+def test_mode_frame_cache():
+    from magichue import modes
+
+    frame = modes.RAINBOW_CROSSFADE.frame()
+    assert frame is modes.RAINBOW_CROSSFADE.frame()
+    assert frame.hex_array() == modes.RAINBOW_CROSSFADE._make_data() + [0x0f, 0x96]
+
+
+def test_idempotent_flags():
+    from magichue import modes
+
+    assert commands.QueryStatus.frame().idempotent
+    assert commands.TurnON.frame().idempotent
+    assert not modes.RAINBOW_CROSSFADE.frame().idempotent
+    assert not commands.Command.from_array([0x31, 0, 0, 0]).idempotent
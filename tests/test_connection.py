@@ -0,0 +1,106 @@
+'''
+Test: magichue/connection.py
+'''
+
+import pytest
+
+from magichue.connection import ConnectionPool
+from magichue.exceptions import DeviceDisconnected
+from magichue.magichue import Status
+from fakebulb import FakeBulb, STATUS_RESPONSE, make_light
+
+
+def test_reconnects_after_drop():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        bulb.drop_connections()
+        light.update_status()
+        assert len(bulb.connections) == 1
+    assert light.rgb == (0x0A, 0x14, 0x1E)
+
+
+def test_no_reconnect():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, reconnect=False)
+        bulb.drop_connections()
+        with pytest.raises(Exception):
+            light.update_status()
+
+
+def test_no_reconnect_stays_disconnected():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, reconnect=False)
+        bulb.drop_connections()
+        with pytest.raises(Exception):
+            light.update_status()
+        with pytest.raises(DeviceDisconnected):
+            light.update_status()
+        assert bulb.connections == []
+        light.close()  # an explicit close allows a new connection
+        light.update_status()
+        assert len(bulb.connections) == 1
+
+
+def test_lazy_and_pooled_lights_connect_on_first_use():
+    pool = ConnectionPool(max_connections=1)
+    with FakeBulb() as bulb:
+        lazy = make_light(bulb, lazy=True)
+        pooled = make_light(bulb, pool=pool, status=Status())
+        assert bulb.connections == [] and len(pool) == 0
+        pooled.turn_on()
+        assert pooled in pool
+        lazy.update_status()
+    assert lazy.rgb == (0x0A, 0x14, 0x1E)
+
+
+def test_pool_evicts_least_recently_used():
+    pool = ConnectionPool(max_connections=2)
+    bulbs = [FakeBulb().__enter__() for _ in range(3)]
+    try:
+        lights = [make_light(bulb, pool=pool) for bulb in bulbs]
+        assert len(pool) == 2
+        assert lights[0]._sock is None
+        assert lights[1] in pool and lights[2] in pool
+
+        lights[0].update_status()
+        assert lights[0] in pool
+        assert lights[1]._sock is None
+        assert lights[2] in pool
+    finally:
+        for bulb in bulbs:
+            bulb.__exit__()
+
+
+def test_only_idempotent_commands_are_resent():
+    from magichue import modes
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        sent = []
+
+        def fail(data):
+            sent.append(data)
+            raise OSError
+
+        light._send = fail
+        with pytest.raises(OSError):
+            light.mode = modes.RAINBOW_CROSSFADE
+        assert len(sent) == 1
+        with pytest.raises(OSError):
+            light.turn_off()
+    assert len(sent) == 2 + light.max_retries
+
+
+def test_timeout_is_not_a_lost_connection():
+    from magichue.exceptions import InvalidData
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb, reconnect=False)
+        light._sock.settimeout(0.1)
+        bulb.status_response = b""
+        with pytest.raises(InvalidData):
+            light.update_status()
+        bulb.status_response = STATUS_RESPONSE
+        light.update_status()
+        assert len(bulb.connections) == 1
+    assert light.rgb == (0x0A, 0x14, 0x1E)
@@ -0,0 +1,86 @@
+'''
+Test: magichue/discover.py
+'''
+
+import asyncio
+import time
+
+import pytest
+
+from magichue.discover import (
+    DISCOVERY_MSG,
+    DiscoveredBulb,
+    aiter_bulbs,
+    iter_bulbs,
+    parse_response,
+)
+from fakebulb import FakeResponder
+
+
+REPLIES = [
+    b"10.0.0.2,ACCF23000001,HF-LPB100-ZJ200",
+    b"10.0.0.3,ACCF23000002,HF-LPB100-ZJ200",
+    b"10.0.0.2,ACCF23000001,HF-LPB100-ZJ200",
+]
+
+
+def test_parse_response():
+    assert parse_response(REPLIES[0]) == DiscoveredBulb(
+        "10.0.0.2", "ACCF23000001", "HF-LPB100-ZJ200"
+    )
+    assert parse_response(DISCOVERY_MSG) is None
+    assert parse_response(b"\xff\xfe") is None
+
+
+def test_iter_bulbs_yields_before_timeout_and_dedups():
+    with FakeResponder(REPLIES) as responder:
+        start = time.monotonic()
+        bulbs = iter_bulbs(timeout=5, broadcast_ip="127.0.0.1", port=responder.port)
+        first = next(bulbs)
+        assert time.monotonic() - start < 1
+        assert first.macaddr == "ACCF23000001"
+        bulbs.close()
+
+        found = list(
+            iter_bulbs(
+                timeout=0.35,
+                broadcast_ip=["127.0.0.1"],
+                interval=0.1,
+                port=responder.port,
+            )
+        )
+    assert [b.ipaddr for b in found] == ["10.0.0.2", "10.0.0.3"]
+    assert responder.received >= 3
+
+
+def test_iter_bulbs_with_many_open_files():
+    resource = pytest.importorskip("resource")
+    import socket
+
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < 1200:
+        pytest.skip("needs more than 1100 file descriptors")
+    held = [socket.socket() for _ in range(1100)]
+    try:
+        with FakeResponder(REPLIES) as responder:
+            found = list(
+                iter_bulbs(timeout=0.2, broadcast_ip="127.0.0.1", port=responder.port)
+            )
+    finally:
+        for sock in held:
+            sock.close()
+    assert len(found) == 2
+
+
+def test_aiter_bulbs():
+    async def run(port):
+        return [
+            bulb
+            async for bulb in aiter_bulbs(
+                timeout=0.3, broadcast_ip="127.0.0.1", port=port
+            )
+        ]
+
+    with FakeResponder(REPLIES) as responder:
+        found = asyncio.run(run(responder.port))
+    assert [b.macaddr for b in found] == ["ACCF23000001", "ACCF23000002"]
@@ -0,0 +1,47 @@
+'''
+Test: magichue/framing.py
+'''
+
+import pytest
+
+from magichue.commands import QueryCurrentTime, QueryStatus
+from magichue.exceptions import InvalidData
+from magichue.framing import FrameDecoder
+from fakebulb import STATUS_RESPONSE, TIME_RESPONSE
+
+
+def test_waits_for_split_frame():
+    decoder = FrameDecoder()
+    decoder.feed(STATUS_RESPONSE[:5])
+    assert decoder.decode([QueryStatus]) is None
+    decoder.feed(STATUS_RESPONSE[5:])
+    cmd, frame = decoder.decode([QueryStatus])
+    assert cmd is QueryStatus
+    assert bytes(frame) == STATUS_RESPONSE
+    assert len(decoder) == 0
+
+
+def test_resyncs_after_garbage_and_bad_checksum():
+    corrupt = bytearray(STATUS_RESPONSE)
+    corrupt[-1] ^= 0xFF
+    decoder = FrameDecoder()
+    decoder.feed(b"\x00\x12" + bytes(corrupt) + STATUS_RESPONSE)
+    cmd, frame = decoder.decode([QueryStatus])
+    assert bytes(frame) == STATUS_RESPONSE
+
+
+def test_earliest_frame_wins():
+    decoder = FrameDecoder()
+    decoder.feed(TIME_RESPONSE + STATUS_RESPONSE)
+    assert decoder.decode([QueryStatus, QueryCurrentTime])[0] is QueryCurrentTime
+    assert decoder.decode([QueryStatus, QueryCurrentTime])[0] is QueryStatus
+
+
+def test_receive_into_buffer():
+    decoder = FrameDecoder(size=16)
+    view = decoder.buffer()
+    view[: len(STATUS_RESPONSE)] = STATUS_RESPONSE
+    decoder.advance(len(STATUS_RESPONSE))
+    assert bytes(decoder.decode([QueryStatus])[1]) == STATUS_RESPONSE
+    with pytest.raises(InvalidData):
+        decoder.feed(bytes(17))
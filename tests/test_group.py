@@ -0,0 +1,86 @@
+'''
+Test: magichue/group.py
+'''
+
+import time
+
+import pytest
+
+from magichue import LightGroup, RAINBOW_CROSSFADE
+from magichue.exceptions import DeviceBusy
+from fakebulb import FakeBulb, make_light
+
+
+class SlowLight:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def turn_on(self):
+        time.sleep(self.delay)
+        return "on"
+
+
+class BrokenLight:
+    def turn_on(self):
+        raise OSError("unreachable")
+
+
+def test_results_per_light():
+    lights = [SlowLight(0), BrokenLight(), SlowLight(0)]
+    with LightGroup(lights) as group:
+        results = group.turn_on()
+    assert [r.ok for r in results] == [True, False, True]
+    assert results[0].result == "on"
+    assert isinstance(results[1].error, OSError)
+
+
+def test_deadline():
+    lights = [SlowLight(0), SlowLight(2)]
+    with LightGroup(lights, timeout=0.2) as group:
+        start = time.perf_counter()
+        results = group.turn_on()
+        assert time.perf_counter() - start < 1
+    assert results[0].ok
+    assert isinstance(results[1].error, TimeoutError)
+
+
+def test_local_lights():
+    bulbs = [FakeBulb().__enter__() for _ in range(3)]
+    try:
+        lights = []
+        for bulb in bulbs:
+            lights.append(make_light(bulb))
+        with LightGroup(lights) as group:
+            assert all(r.ok for r in group.set_rgb((1, 2, 3)))
+            assert all(r.ok for r in group.set_mode(RAINBOW_CROSSFADE))
+            assert all(r.ok for r in group.update_status())
+    finally:
+        for bulb in bulbs:
+            bulb.__exit__()
+    assert all(light.rgb == (0x0A, 0x14, 0x1E) for light in lights)
+
+
+class ColorLight:
+    rgb = None
+
+
+def test_set_colors():
+    from magichue import color
+
+    lights = [ColorLight() for _ in range(4)]
+    with LightGroup(lights) as group:
+        results = group.set_colors(color.rainbow(len(group)))
+        with pytest.raises(ValueError):
+            group.set_colors([(0, 0, 0)])
+    assert all(r.ok for r in results)
+    assert [light.rgb for light in lights] == color.rainbow(4)
+
+
+def test_light_still_running_is_not_driven_twice():
+    light = SlowLight(0.5)
+    with LightGroup([light], timeout=0.1) as group:
+        assert isinstance(group.turn_on()[0].error, TimeoutError)
+        result = group.turn_on()[0]
+        assert isinstance(result.error, DeviceBusy)
+        time.sleep(0.5)
+        assert group.turn_on(timeout=1)[0].ok
@@ -0,0 +1,110 @@
+'''
+Test: magichue/http_api.py
+'''
+
+import pytest
+
+from magichue import RemoteAPI, RemoteLight, RemoteLightGroup
+from fakebulb import STATUS_RESPONSE
+
+
+class RecordingAPI(RemoteAPI):
+    def __init__(self, *args, **kwargs):
+        super().__init__("token", *args, **kwargs)
+        self.posts = []
+
+    def _post_with_token(self, endpoint, payload):
+        self.posts.append((endpoint, payload))
+        if endpoint == "/sendRequestCommand/MagicHue":
+            return {"code": 0, "data": STATUS_RESPONSE.hex()}
+        return {"code": 0}
+
+
+def batch_posts(api):
+    return [p for e, p in api.posts if e == "/sendCommandBatch/MagicHue"]
+
+
+def test_send_command_batch_splits():
+    api = RecordingAPI(max_batch_size=2)
+    light = RemoteLight(api, "aa")
+    items = [("mac%d" % i, light._status_frames()[0]) for i in range(5)]
+    results = api.send_command_batch(items)
+    sizes = [len(p["dataCommandItems"]) for p in batch_posts(api)]
+    assert len(results) == 3
+    assert sizes == [2, 2, 1]
+
+
+def test_single_command_uses_batch_endpoint():
+    api = RecordingAPI()
+    RemoteLight(api, "aa").turn_on()
+    assert batch_posts(api) == [
+        {"dataCommandItems": [{"hexData": "71230fa3", "macAddress": "aa"}]}
+    ]
+
+
+def test_remote_group_costs_one_request():
+    api = RecordingAPI()
+    lights = [RemoteLight(api, "mac%d" % i) for i in range(10)]
+    group = RemoteLightGroup(api, lights)
+    group.set_rgb((1, 2, 3))
+    posts = batch_posts(api)
+    assert len(posts) == 1
+    assert [i["macAddress"] for i in posts[0]["dataCommandItems"]] == [
+        light.macaddr for light in lights
+    ]
+    assert all(light.rgb == (1, 2, 3) for light in lights)
+
+
+def test_remote_group_keeps_status_of_failed_chunk():
+    class FailingAPI(RecordingAPI):
+        def _post_with_token(self, endpoint, payload):
+            if len(batch_posts(self)) == 1:
+                raise ConnectionError
+            return super()._post_with_token(endpoint, payload)
+
+    api = FailingAPI(max_batch_size=2)
+    lights = [RemoteLight(api, "mac%d" % i) for i in range(4)]
+    group = RemoteLightGroup(api, lights)
+    with pytest.raises(ConnectionError):
+        group.set_rgb((1, 2, 3))
+    assert [light.rgb for light in lights] == [(1, 2, 3)] * 2 + [
+        (0x0A, 0x14, 0x1E)
+    ] * 2
+
+
+def test_session_reuses_connection():
+    from fakeapi import FakeAPI
+
+    with FakeAPI() as server:
+        with RemoteAPI.login_with_user_password(
+            "user", "password", api_base=server.base
+        ) as api:
+            light = RemoteLight(api, "aa")
+            for _ in range(5):
+                light.turn_on()
+            light.update_status()
+    assert len(server.requests) == 8
+    assert server.connections == 1
+
+
+def test_get_online_bulbs_from_device_state():
+    from fakeapi import FakeAPI
+
+    with FakeAPI(devices=20) as server:
+        api = RemoteAPI("token", api_base=server.base)
+        bulbs = api.get_online_bulbs(use_device_state=True)
+    assert len(bulbs) == 20
+    assert [path for path, _ in server.requests] == [
+        "/app/getMyBindDevicesAndState/MagicHue"
+    ]
+    assert all(bulb.rgb == (0x0A, 0x14, 0x1E) for bulb in bulbs)
+
+
+def test_get_online_bulbs_concurrently():
+    from fakeapi import FakeAPI
+
+    with FakeAPI(devices=20) as server:
+        api = RemoteAPI("token", api_base=server.base)
+        bulbs = api.get_online_bulbs(max_workers=8)
+    assert [bulb.macaddr for bulb in bulbs] == ["MAC%04d" % i for i in range(20)]
+    assert len(server.requests) == 21
@@ -0,0 +1,97 @@
+'''
+Test: magichue/instrument.py
+'''
+
+import pytest
+
+from magichue import RemoteAPI, RemoteLight
+from magichue.instrument import Histogram, Instrument, MetricsCollector
+from fakeapi import FakeAPI
+from fakebulb import FakeBulb, make_light
+
+
+class Recorder(Instrument):
+    def __init__(self):
+        self.before = []
+        self.after = []
+
+    def before_send(self, event):
+        self.before.append(event.command)
+
+    def after_send(self, event):
+        self.after.append(event)
+
+
+def test_histogram_quantiles():
+    hist = Histogram([0.01, 0.1, 1])
+    for value in (0.005, 0.005, 0.05, 0.5):
+        hist.add(value)
+    assert hist.count == 4
+    assert hist.quantile(0.5) == 0.01
+    assert hist.quantile(1) == 0.5
+    assert hist.as_dict()["buckets"][float("inf")] == 0
+
+
+def test_local_light_events():
+    metrics = MetricsCollector()
+    recorder = Recorder()
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        light.add_instrument(metrics)
+        light.add_instrument(recorder)
+        light.update_status()
+        light.rgb = (1, 2, 3)
+    assert recorder.before == ["QueryStatus", "SetColor"]
+    status, color = recorder.after
+    assert status.target == bulb.host
+    assert status.size == 4
+    assert status.latency > 0
+    assert status.error is None and status.retries == 0
+    snapshot = metrics.snapshot()
+    assert snapshot["commands"]["QueryStatus"]["sent"] == 1
+    assert snapshot["targets"][bulb.host]["sent"] == 2
+    assert metrics.slowest(1)[0][0] == bulb.host
+
+
+def test_retries_and_errors_are_counted():
+    recorder = Recorder()
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        light.add_instrument(recorder)
+        bulb.drop_connections()
+        light.update_status()
+    assert recorder.after[-1].retries == 1
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb, reconnect=False)
+        light.add_instrument(recorder)
+        bulb.drop_connections()
+        with pytest.raises(Exception):
+            light.update_status()
+    assert recorder.after[-1].error is not None
+
+
+def test_failing_instrument_is_ignored():
+    class Broken(Instrument):
+        def after_send(self, event):
+            raise RuntimeError
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        light.add_instrument(Broken())
+        light.update_status()
+    assert light.rgb == (0x0A, 0x14, 0x1E)
+
+
+def test_remote_api_and_light_events():
+    metrics = MetricsCollector()
+    with FakeAPI(devices=1) as fake:
+        api = RemoteAPI("TOKEN", api_base=fake.base)
+        api.add_instrument(metrics)
+        light = RemoteLight(api, "MAC0000")
+        light.add_instrument(metrics)
+        light.update_status()
+    commands = metrics.snapshot()["commands"]
+    assert commands["QueryStatus"]["sent"] == 1
+    assert commands["/sendRequestCommand/MagicHue"]["bytes"] > 0
+    assert "MAC0000" in metrics.targets
@@ -0,0 +1,402 @@
+'''
+Test: magichue/light.py
+'''
+
+import time
+
+import pytest
+
+from magichue import commands, utils
+from magichue.exceptions import DeviceDisconnected
+from fakebulb import FakeBulb, STATUS_RESPONSE, make_light
+
+
+def test_update_status_does_not_wait_for_timeout():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        start = time.perf_counter()
+        light.update_status()
+        elapsed = time.perf_counter() - start
+    assert elapsed < light.timeout / 2
+    assert light.rgb == (0x0A, 0x14, 0x1E)
+
+
+def test_query_after_write_is_not_delayed():
+    from magichue import modes
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        light.mode = modes.RAINBOW_CROSSFADE
+        start = time.perf_counter()
+        light.update_status()
+        elapsed = time.perf_counter() - start
+    assert elapsed < 0.02
+
+
+def test_stale_bytes_are_skipped():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        bulb.status_response = b"\x0f\x71\x23\xa3" + STATUS_RESPONSE
+        data = light._send_command(commands.QueryStatus, send_only=False)
+    assert bytes(data) == STATUS_RESPONSE
+
+
+def test_query_current_time():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        light.turn_on()
+        bulb_time = light.get_current_time()
+    assert (bulb_time.year, bulb_time.month, bulb_time.day) == (2021, 12, 21)
+
+
+def test_response_is_copied_before_other_exchanges():
+    import threading
+
+    from fakebulb import TIME_RESPONSE, light_class
+
+    others = []
+
+    with FakeBulb() as bulb:
+        class _Light(light_class(bulb.port)):
+            def _send_command_view(self, cmd, send_only=True):
+                view = super()._send_command_view(cmd, send_only)
+                if cmd is commands.QueryCurrentTime:
+                    # Another thread's exchange, before the view is copied.
+                    other = threading.Thread(target=self.update_status)
+                    other.start()
+                    other.join(0.1)
+                    others.append(other)
+                return view
+
+        light = _Light(bulb.host, lazy=True)
+        data = light._send_command(commands.QueryCurrentTime, send_only=False)
+        others[0].join()
+    assert data == TIME_RESPONSE
+
+
+def test_lazy_light_loads_on_first_read():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, lazy=True)
+        assert bulb.received == []
+        assert light.rgb == (0x0A, 0x14, 0x1E)
+        assert light.on
+    assert [frame[0] for frame in bulb.received] == [0x81]
+
+
+def test_repr_does_not_query_the_bulb():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, lazy=True)
+        assert repr(light) == "<_Light: %s (status not loaded)>" % bulb.host
+        assert bulb.received == []
+        light.update_status()
+        assert repr(light) == "<_Light: on (r:10 g:20 b:30 w:0)>"
+
+
+def test_lazy_light_write_only():
+    from magichue.magichue import Status
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb, status=Status(is_white=False))
+        light.rgb = (255, 0, 0)
+        light.turn_off()
+        time.sleep(0.1)
+    assert [frame[0] for frame in bulb.received] == [0x31, 0x71]
+
+
+def test_lazy_light_queries_before_partial_write():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, lazy=True)
+        light.g = 99
+        time.sleep(0.1)
+    assert [frame[0] for frame in bulb.received] == [0x81, 0x31]
+    assert bulb.received[1][1:7] == bytes([0x0A, 99, 0x1E, 0x00, 0xF0, 0x0F])
+
+
+def test_lazy_light_keeps_speed_set_before_loading():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, lazy=True)
+        light.speed = 0.5
+        time.sleep(0.1)
+    assert light.status.speed == 0.5
+    assert [frame[0] for frame in bulb.received] == [0x81, 0x61]
+    assert bulb.received[1][2] == utils.speed2slowness(0.5)
+
+
+def test_lazy_light_full_write_with_bulb_type():
+    from magichue import bulb_types
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb, lazy=True, bulb_type=bulb_types.BULB_RGBWW)
+        light.rgb = (1, 2, 3)
+        light.update(r=4, g=5, b=6)
+        time.sleep(0.1)
+    assert [frame[0] for frame in bulb.received] == [0x31, 0x31]
+    assert bulb.received[1][1:7] == bytes([4, 5, 6, 0x00, 0xF0, 0x0F])
+
+
+def test_batch_sends_one_frame():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        with light.batch():
+            light.r = 1
+            light.g = 2
+            light.b = 3
+        time.sleep(0.1)
+    assert [frame[0] for frame in bulb.received] == [0x81, 0x31]
+    assert bulb.received[1][1:4] == b"\x01\x02\x03"
+
+
+def test_failed_batch_restores_status():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        with pytest.raises(RuntimeError):
+            with light.batch():
+                light.r = 1
+                light.turn_off()
+                raise RuntimeError
+        time.sleep(0.1)
+    assert [frame[0] for frame in bulb.received] == [0x81]
+    assert light.rgb == (0x0A, 0x14, 0x1E)
+    assert light.on
+
+
+def test_failed_batch_keeps_status_loaded_inside_it():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, lazy=True)
+        with pytest.raises(RuntimeError):
+            with light.batch():
+                light.g = 99
+                raise RuntimeError
+    assert light.rgb == (0x0A, 0x14, 0x1E)
+    assert not light.is_white
+
+
+def test_update_skips_unchanged():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        light.update(r=0x0A, g=0x14, on=True)
+        light.update(b=0x1F, on=False)
+        time.sleep(0.1)
+    assert [frame[0] for frame in bulb.received] == [0x81, 0x31, 0x71]
+
+
+def test_update_power_of_lazy_light():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, lazy=True)
+        light.update(on=True)
+        time.sleep(0.1)
+    assert [frame[0] for frame in bulb.received] == [0x71]
+
+
+def test_stream_sends_every_color_at_reachable_fps():
+    colors = [(i, i, i) for i in range(20)]
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        start = time.perf_counter()
+        stats = light.stream(iter(colors), max_fps=50)
+        elapsed = time.perf_counter() - start
+        time.sleep(0.1)
+    color_frames = [frame for frame in bulb.received if frame[0] == 0x31]
+    assert stats.sent == len(colors) == len(color_frames)
+    assert stats.dropped == 0
+    assert [frame[1] for frame in color_frames] == list(range(20))
+    assert elapsed >= 19 * 0.02 - 0.01
+
+
+def test_stream_slow_source_is_not_late():
+    def colors():
+        for i in range(10):
+            time.sleep(0.05)
+            yield (i, 0, 0)
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        stats = light.stream(colors(), max_fps=30)
+    assert stats.sent == 10
+    assert stats.late == 0
+
+
+def test_stream_stops_producer_when_send_fails():
+    import itertools
+    import threading
+
+    def colors():
+        for i in itertools.count():
+            yield (i % 256, 0, 0)
+
+    def fail(_):
+        raise DeviceDisconnected
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb, reconnect=False)
+        light._send = fail
+        with pytest.raises(DeviceDisconnected):
+            light.stream(colors(), max_fps=100)
+    assert not [t for t in threading.enumerate() if t.name == "magichue-stream"]
+
+
+def test_stream_drops_frames_when_bulb_stops_reading():
+    import socket
+    import threading
+
+    from magichue.magichue import Status
+
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    accepted = []
+    threading.Thread(
+        target=lambda: accepted.append(server.accept()), daemon=True
+    ).start()
+
+    def colors():
+        for i in range(2000):
+            time.sleep(0.0005)
+            yield (i % 256, 0, 0)
+
+    light = make_light(server.getsockname(), status=Status(is_white=False))
+    stats = light.stream(colors(), max_fps=1000)
+    light.close()
+    server.close()
+    assert stats.sent < 500
+    assert stats.sent + stats.dropped == 2000
+
+
+def test_astream_rate_limit():
+    import asyncio
+
+    async def colors():
+        for i in range(10):
+            yield (i, 0, 0)
+            await asyncio.sleep(0.01)
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        start = time.perf_counter()
+        stats = asyncio.run(light.astream(colors(), max_fps=10))
+        elapsed = time.perf_counter() - start
+    assert stats.sent + stats.dropped == 10
+    assert elapsed >= (stats.sent - 1) * 0.1 - 0.01
+    assert light.rgb == (9, 0, 0)
+
+
+def test_dedup_suppresses_repeated_frames():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        light.dedup = True
+        light.turn_on()
+        light.rgb = (1, 2, 3)
+        light.rgb = (1, 2, 3)
+        light.rgb = (3, 2, 1)
+        time.sleep(0.1)
+    assert [frame[0] for frame in bulb.received] == [0x81, 0x31, 0x31]
+    assert light.frames_sent == 2
+    assert light.frames_suppressed == 2
+
+
+def test_dedup_ttl():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        light.dedup = True
+        light.dedup_ttl = 0.05
+        light.rgb = (1, 2, 3)
+        time.sleep(0.1)
+        light.rgb = (1, 2, 3)
+    assert light.frames_sent == 2
+    assert light.frames_suppressed == 0
+
+
+def test_query_many_in_any_order():
+    from fakebulb import TIME_RESPONSE
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        data = light.query_many([commands.QueryCurrentTime, commands.QueryStatus])
+    assert bytes(data[0]) == TIME_RESPONSE
+    assert bytes(data[1]) == STATUS_RESPONSE
+
+
+def test_snapshot():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, lazy=True)
+        snap = light.snapshot()
+    assert snap.status.rgb() == (0x0A, 0x14, 0x1E)
+    assert snap.current_time.year == 2021
+    assert len(snap.timers) == commands.QueryTimers.response_len
+    assert len(snap.custom_mode) == commands.QueryCustomMode.response_len
+
+
+def test_status_parses_buffers_and_interns_unknown_modes():
+    from magichue.magichue import Status
+    from magichue import modes
+
+    status = Status.from_bytes(memoryview(bytearray(STATUS_RESPONSE)))
+    assert status.rgb() == (0x0A, 0x14, 0x1E)
+    assert status.on
+    assert status.dump() == STATUS_RESPONSE
+    assert not hasattr(status, "__dict__")
+
+    unknown = bytearray(STATUS_RESPONSE)
+    unknown[3] = 0x99
+    modes_seen = {id(Status.from_bytes(unknown).mode) for _ in range(3)}
+    assert len(modes_seen) == 1
+    assert modes.get_mode(0x99).name == "UNKOWN"
+
+
+def test_status_copy():
+    from magichue import modes
+    from magichue.magichue import Status
+
+    status = Status(r=1, is_white=False)
+    status.mode = modes.CustomMode(mode=modes.MODE_JUMP, speed=0.45, colors=[])
+    status.speed = 0.45
+    copy = status.copy()
+    status.r = 2
+    assert copy.r == 1 and not copy.is_white
+    assert copy.mode is status.mode and copy.speed == 0.45
+
+
+def test_responses_reuse_receive_buffer():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        decoder = light._decoder
+        bulb.status_response = b"\x0f\x71" + STATUS_RESPONSE
+        light.update_status()
+        light.update_status()
+        data = light._send_command(commands.QueryStatus, send_only=False)
+    assert light._decoder is decoder
+    assert data == STATUS_RESPONSE
+    assert light.rgb == (0x0A, 0x14, 0x1E)
+
+
+def test_str2hexarray():
+    from magichue import RemoteLight
+
+    assert RemoteLight.str2hexarray("0f71a3") == (0x0F, 0x71, 0xA3)
+
+
+def test_corrupt_response_is_skipped():
+    corrupt = bytearray(STATUS_RESPONSE)
+    corrupt[6] ^= 0xFF
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        bulb.status_response = bytes(corrupt) + STATUS_RESPONSE
+        light.update_status()
+    assert light.rgb == (0x0A, 0x14, 0x1E)
+
+
+def test_no_fading_sends_cached_jump_frame():
+    from magichue import modes
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb, allow_fading=False)
+        light.rgb = (1, 2, 3)
+        light.rgb = (1, 2, 3)
+        deadline = time.monotonic() + 1
+        while len(bulb.received) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    jump = modes.jump_frame((1, 2, 3))
+    assert modes.jump_frame((1, 2, 3)) is jump
+    assert [frame[0] for frame in bulb.received[1:]] == [0x51, 0x31, 0x51, 0x31]
+    assert bulb.received[1] == jump.byte_string()
@@ -0,0 +1,144 @@
+'''
+Test: magichue/poller.py
+'''
+
+import asyncio
+import time
+
+from magichue import LocalLight
+from magichue.magichue import Status
+from magichue.poller import StatusPoller
+from fakebulb import FakeBulb, STATUS_RESPONSE, make_light
+
+
+def with_red(red):
+    data = bytearray(STATUS_RESPONSE)
+    data[6] = red
+    data[-1] = sum(data[:-1]) & 0xFF
+    return bytes(data)
+
+
+def test_interval_adapts_to_changes():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        poller = StatusPoller([light], min_interval=1, max_interval=3, jitter=0)
+        assert poller.poll(light) is None
+        assert poller.poll(light) is None
+        assert poller.interval(light) == 2.25
+        assert poller.poll(light) is None
+        assert poller.interval(light) == 3
+
+        bulb.status_response = with_red(0x50)
+        change = poller.poll(light)
+        light.close()
+    assert change.changes == {"r": (0x0A, 0x50)}
+    assert change.old.r == 0x0A and change.new.r == 0x50
+    assert poller.interval(light) == 1
+
+
+def test_custom_mode_set_here_is_not_a_change():
+    from magichue import modes
+    from magichue.poller import diff_status
+
+    old = Status()
+    old.mode = modes.CustomMode(modes.MODE_GRADUALLY, 1.0, [(255, 0, 0)])
+    new = Status()
+    new.mode = modes.CUSTOM
+    assert diff_status(old, new) == {}
+    new.mode = modes.RAINBOW_CROSSFADE
+    assert list(diff_status(old, new)) == ["mode"]
+
+
+def test_unreachable_light_backs_off():
+    with FakeBulb() as bulb:
+        light = make_light(bulb, reconnect=False)
+    bulb.drop_connections()
+    poller = StatusPoller([light], min_interval=1, jitter=0, max_backoff=3)
+    start = time.monotonic()
+    assert poller.poll(light) is None
+    assert poller.unreachable() == [light]
+    assert 2 <= poller._schedules[id(light)].due - start < 2.5
+    poller.poll(light)
+    poller.poll(light)
+    assert poller._schedules[id(light)].due - start < 3.5
+
+
+def test_background_polling_calls_callbacks():
+    changes = []
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        with StatusPoller([light], min_interval=0.02, max_interval=0.05) as poller:
+            poller.add_callback(changes.append)
+            time.sleep(0.1)
+            assert changes == []
+            bulb.status_response = with_red(0x60)
+            deadline = time.monotonic() + 2
+            while not changes and time.monotonic() < deadline:
+                time.sleep(0.01)
+        light.close()
+    assert [change.changes["r"] for change in changes] == [(0x0A, 0x60)]
+
+
+def test_async_changes():
+    with FakeBulb() as bulb:
+        light = make_light(bulb)
+        poller = StatusPoller([light], min_interval=0.02, max_interval=0.05)
+
+        async def first_change():
+            bulb.status_response = with_red(0x70)
+            async for change in poller.changes():
+                return change
+
+        change = asyncio.run(asyncio.wait_for(first_change(), 2))
+        light.close()
+    assert change.new.r == 0x70
+    assert not poller.running
+
+
+def test_poll_skips_light_already_being_polled():
+    import threading
+
+    polling = threading.Event()
+    release = threading.Event()
+
+    class _Light(LocalLight):
+        polls = 0
+
+        def update_status(self):
+            self.polls += 1
+            polling.set()
+            release.wait(1)
+
+    light = _Light("127.0.0.1", status=Status(), lazy=True)
+    poller = StatusPoller([light], jitter=0)
+    worker = threading.Thread(target=poller.poll, args=(light,))
+    worker.start()
+    polling.wait(1)
+    assert poller.poll(light) is None
+    release.set()
+    worker.join()
+    assert light.polls == 1
+
+
+def test_polls_and_commands_share_the_socket():
+    from concurrent.futures import ThreadPoolExecutor
+
+    with FakeBulb() as bulb:
+        light = make_light(bulb, reconnect=False)
+        poller = StatusPoller([light], jitter=0)
+
+        def poll(_):
+            poller.poll(light)
+            assert not poller.unreachable()
+
+        def use(i):
+            light.rgb = (i, 0, 0)
+            light.get_current_time()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(f, i) for i in range(100) for f in (poll, use)]
+        for future in futures:
+            future.result()
+        light.update_status()
+        light.close()
+    assert light.rgb == (0x0A, 0x14, 0x1E)
@@ -0,0 +1,118 @@
+'''
+Test: magichue/registry.py
+'''
+
+import time
+
+import pytest
+
+from magichue import utils
+from magichue.registry import BulbRegistry
+from fakebulb import FakeBulb, FakeResponder, light_class
+
+
+MAC = "ACCF23000001"
+
+
+def make_registry(bulb, responder, path, **kwargs):
+    _Light = light_class(bulb.port)
+
+    class _Registry(BulbRegistry):
+        light_class = _Light
+        discovery_port = responder.port
+
+    kwargs.setdefault("timeout", 0.2)
+    return _Registry(path, broadcast_ip="127.0.0.1", **kwargs)
+
+
+def status_queries(bulb):
+    return [frame for frame in bulb.received if frame[0] == 0x81]
+
+
+def test_cached_status_survives_restart(tmp_path):
+    path = str(tmp_path / "bulbs.json")
+    reply = ("127.0.0.1,%s,HF-LPB100" % MAC).encode()
+    with FakeBulb() as bulb, FakeResponder([reply]) as responder:
+        registry = make_registry(bulb, responder, path)
+        registry.refresh()
+        assert registry[MAC].ipaddr == "127.0.0.1"
+        assert registry[MAC].model == "HF-LPB100"
+        light = registry.light(MAC)
+        assert registry.light(MAC) is light
+        light.update_status()
+        registry.save()
+        queries = len(status_queries(bulb))
+
+        restarted = make_registry(bulb, responder, path)
+        assert not restarted.stale
+        assert [entry.macaddr for entry in restarted.bulbs()] == [MAC]
+        light = restarted.light(MAC)
+        assert light.status.rgb() == (0x0A, 0x14, 0x1E)
+        assert len(status_queries(bulb)) == queries
+        # The cached status is a hint; the first read asks the bulb.
+        assert light.rgb == (0x0A, 0x14, 0x1E)
+        assert len(status_queries(bulb)) == queries + 1
+
+
+def test_save_light_in_custom_mode(tmp_path):
+    from magichue import modes
+
+    path = str(tmp_path / "bulbs.json")
+    reply = ("127.0.0.1,%s,HF-LPB100" % MAC).encode()
+    with FakeBulb() as bulb, FakeResponder([reply]) as responder:
+        registry = make_registry(bulb, responder, path)
+        registry.refresh()
+        light = registry.light(MAC)
+        light.update_status()
+        light.mode = modes.CustomMode(
+            mode=modes.MODE_JUMP, speed=0.45, colors=[(255, 0, 0)]
+        )
+        registry.save()
+        status = make_registry(bulb, responder, path)[MAC].status
+    assert status.mode is modes.CUSTOM
+    assert status.speed == utils.slowness2speed(utils.speed2slowness(0.45))
+
+
+def test_save_without_path():
+    registry = BulbRegistry()
+    with pytest.raises(ValueError):
+        registry.save()
+
+
+def test_cached_status_does_not_hide_changes(tmp_path):
+    path = str(tmp_path / "bulbs.json")
+    reply = ("127.0.0.1,%s,HF-LPB100" % MAC).encode()
+    with FakeBulb() as bulb, FakeResponder([reply]) as responder:
+        registry = make_registry(bulb, responder, path)
+        registry.refresh()
+        registry.light(MAC).update_status()
+        registry.save()
+
+        light = make_registry(bulb, responder, path).light(MAC)
+        light.update(r=0x0A, g=0x14, b=0x1E)
+        time.sleep(0.1)
+    assert bulb.received[-1][0] == 0x31
+
+
+def test_stale_registry_refreshes_in_background(tmp_path):
+    path = str(tmp_path / "bulbs.json")
+    reply = ("127.0.0.1,%s,HF-LPB100" % MAC).encode()
+    with FakeBulb() as bulb, FakeResponder([reply]) as responder:
+        registry = make_registry(bulb, responder, path, ttl=0)
+        assert registry.bulbs() == []
+        registry._refresh_thread.join()
+        assert [entry.macaddr for entry in registry.bulbs()] == [MAC]
+
+
+def test_light_follows_new_address(tmp_path):
+    path = str(tmp_path / "bulbs.json")
+    reply = ("127.0.0.2,%s,HF-LPB100" % MAC).encode()
+    with FakeBulb() as old, FakeBulb("127.0.0.2", port=old.port) as new:
+        with FakeResponder([reply]) as responder:
+            registry = make_registry(old, responder, path)
+            registry._found(MAC, "127.0.0.1", "HF-LPB100")
+            light = registry.light(MAC)
+            registry.refresh()
+            assert light.ipaddr == "127.0.0.2"
+            light.update_status()
+    assert status_queries(new)
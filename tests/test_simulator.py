@@ -0,0 +1,76 @@
+'''
+Test: magichue/simulator.py
+'''
+
+import time
+
+from magichue import bulb_types, modes
+from magichue.discover import iter_bulbs
+from magichue.simulator import SimulatedBulb, Simulator
+from fakebulb import make_light
+
+
+def wait_for(predicate, timeout=1):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_light_against_simulated_bulbs():
+    bulbs = [
+        SimulatedBulb(bulb_types.BULB_RGBWW),
+        SimulatedBulb(bulb_types.BULB_RGBWWCW),
+    ]
+    simulator = Simulator(bulbs, port=0, discovery_port=None)
+    with simulator.running():
+        for address, bulb in zip(simulator.addresses, bulbs):
+            light = make_light(address)
+            assert light.status.bulb_type == bulb.status.bulb_type
+            light.is_white = False
+            light.rgb = (10, 20, 30)
+            light.turn_off()
+            assert wait_for(lambda: not bulb.status.on)
+            assert bulb.status.rgb() == (10, 20, 30)
+            light.mode = modes.RAINBOW_CROSSFADE
+            assert wait_for(lambda: bulb.status.mode is modes.RAINBOW_CROSSFADE)
+            snapshot = light.snapshot()
+            assert snapshot.status.mode is modes.RAINBOW_CROSSFADE
+            assert snapshot.current_time.year >= 2021
+            light.close()
+
+
+def test_no_fading_custom_mode_is_applied():
+    bulb = SimulatedBulb(bulb_types.BULB_TAPE)
+    simulator = Simulator([bulb], port=0, discovery_port=None)
+    with simulator.running():
+        light = make_light(simulator.addresses[0], allow_fading=False)
+        light.rgb = (1, 2, 3)
+        assert wait_for(lambda: bulb.status.rgb() == (1, 2, 3))
+        assert bulb.custom_mode[:4] == bytes([1, 2, 3, 0])
+        light.close()
+
+
+def test_latency():
+    bulb = SimulatedBulb(latency=0.05)
+    simulator = Simulator([bulb], port=0, discovery_port=None)
+    with simulator.running():
+        light = make_light(simulator.addresses[0])
+        start = time.monotonic()
+        light.update_status()
+        assert time.monotonic() - start >= 0.05
+        light.close()
+
+
+def test_discovery():
+    bulbs = [SimulatedBulb(seed=1), SimulatedBulb(seed=2)]
+    simulator = Simulator(
+        bulbs, port=0, discovery_host="127.0.0.1", discovery_port=0
+    )
+    with simulator.running():
+        found = list(
+            iter_bulbs(
+                timeout=0.2, broadcast_ip="127.0.0.1", port=simulator.discovery_port
+            )
+        )
+    assert sorted(b.macaddr for b in found) == sorted(b.macaddr for b in bulbs)